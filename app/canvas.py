@@ -1,9 +1,13 @@
 from turtle import color
 import matplotlib.patches as patches
 import matplotlib.pyplot as plt
+import numpy as np
 from matplotlib.axes import Axes
+from matplotlib.collections import EllipseCollection
+from matplotlib.lines import Line2D
 
 from app.model import Event, Node
+from app.profiling import PROFILER
 
 
 class CanvasView:
@@ -13,6 +17,12 @@ class CanvasView:
         self.nodes = nodes
 
         self._press = None
+        self.hud = None
+
+        # persistent route artists
+        self.show_all_routes = False
+        self.route_lines = {}  # key -> (Line2D, route version)
+        self.route_connector = None
 
         # ===== initial view =====
         self.ax.set_xlim(0, area.width)
@@ -101,12 +111,60 @@ class CanvasView:
         current_events: list[Event] = [],
         buffer: list[str] = [],
         beacon_nodes: list[str] = [],
+    ):
+        with PROFILER.stage("redraw"):
+            self._redraw(
+                highlight_route, selected_node, current_events, buffer, beacon_nodes
+            )
+
+        if PROFILER.enabled:
+            added = len(self.ax.get_children()) - self._cleared_artists
+            PROFILER.count("artists", added)
+
+    def _route_line(self, key, route, **style):
+        """
+        Persistent Line2D per key, its data is only replaced when the
+        route version changes. ax.clear() detaches it, so re-add it.
+        """
+        line, version = self.route_lines.get(key, (None, None))
+        if line is None:
+            line = Line2D([], [], **style)
+        if version != route.version:
+            line.set_data(route.coords[:, 0], route.coords[:, 1])
+
+        self.route_lines[key] = (line, route.version)
+        self.ax.add_line(line)
+
+    def set_hud(self, text: str):
+        """Profiling overlay, a figure text so it survives ax.clear()"""
+        if self.hud is None:
+            self.hud = self.ax.figure.text(
+                0.01,
+                0.99,
+                "",
+                family="monospace",
+                fontsize=8,
+                va="top",
+                bbox=dict(boxstyle="round,pad=0.3", fc="white", alpha=0.8),
+                zorder=20,
+            )
+        self.hud.set_text(text)
+
+    def _redraw(
+        self,
+        highlight_route,
+        selected_node,
+        current_events,
+        buffer,
+        beacon_nodes,
     ):
         # 🔒 save camera BEFORE clearing
         xlim = self.ax.get_xlim()
         ylim = self.ax.get_ylim()
 
         self.ax.clear()
+        # spines, axis and patch are left, only what is drawn below counts
+        self._cleared_artists = len(self.ax.get_children())
         self.ax.grid(True)
 
         # ===== extract events =====
@@ -114,67 +172,90 @@ class CanvasView:
         buffer_events = [e.data for e in current_events if e.type == "buffer"]
 
         # ===== draw nodes =====
-        for node in self.nodes.values():
-            if node.pos is None:
-                continue
+        nodes = self.nodes
+        xs = nodes.pos[:, 0]
+        ys = nodes.pos[:, 1]
+
+        self.ax.scatter(xs, ys, s=60, c=nodes.rgb(), zorder=3)
+        for nid, x, y in zip(nodes.ids, xs, ys):
+            self.ax.text(x + 15, y - 5, nid, fontsize=9)
+
+        # ----- buffer bars -----
+        has_buffer = nodes.buffer_size > 0
+        if has_buffer.any():
+            self.ax.bar(
+                xs[has_buffer] - 25,
+                nodes.buffer_count[has_buffer] * 10,
+                width=20,
+                bottom=ys[has_buffer] - 15,
+                color="gray",
+                zorder=2,
+            )
 
-            x, y = node.pos
-            c = tuple(v / 255 for v in node.color)
-
-            self.ax.scatter(x, y, s=60, c=[c], zorder=3)
-            self.ax.text(x + 15, y - 5, node.nid, fontsize=9)
-
-            # ----- buffer bar -----
-            if node.buffer_size > 0:
-                ratio = len(node.buffer)
-                self.ax.bar(
-                    x - 25,
-                    ratio * 10,
-                    width=20,
-                    bottom=y - 15,
-                    color="gray",
-                    zorder=2,
+        # ----- ranges (only ferry) -----
+        centers = []
+        diameters = []
+        for i in np.flatnonzero(nodes.is_type("ferry")):
+            for r in nodes.ranges[i]:
+                centers.append(nodes.pos[i])
+                diameters.append(2 * r)
+
+        if diameters:
+            self.ax.add_collection(
+                EllipseCollection(
+                    diameters,
+                    diameters,
+                    0,
+                    units="xy",
+                    offsets=centers,
+                    offset_transform=self.ax.transData,
+                    facecolors="none",
+                    edgecolors="black",
+                    linestyles="--",
+                    alpha=0.2,
+                    zorder=1,
                 )
-
-            # ----- ranges (only ferry) -----
-            if node.type == "ferry":
-                for r in node.ranges:
-                    self.ax.add_patch(
-                        patches.Circle(
-                            (x, y),
-                            r,
-                            fill=False,
-                            linestyle="--",
-                            alpha=0.2,
-                            zorder=1,
-                        )
-                    )
+            )
 
         for node in beacon_nodes:
-            x, y = self.nodes[node].pos
+            n = self.nodes[node]
+            if not n.ranges:
+                continue
             # draw circle
             self.ax.add_patch(
                 patches.Circle(
-                    (x, y),
-                    r,
+                    n.pos,
+                    n.ranges[0],
                     fill=True,
                     color="green",
                     alpha=0.2,
                     zorder=1,
                 )
             )
+        # ===== routes =====
+        if self.show_all_routes:
+            for nid, route in zip(self.nodes.ids, self.nodes.routes):
+                if route:
+                    c = tuple(v / 255 for v in self.nodes[nid].color)
+                    self._route_line(
+                        nid, route, linestyle="--", lw=1, color=c, alpha=0.4, zorder=2
+                    )
+
         # ===== route highlight =====
         if highlight_route:
-            pts = []
-            pts.append(self.nodes[selected_node].pos)
-            for pos in highlight_route:
-                x = pos.split(":")[0]
-                y = pos.split(":")[1]
-                pts.append((float(x), float(y)))
+            self._route_line(
+                "selected", highlight_route, linestyle="--", lw=2, color="r", zorder=4
+            )
 
-            if len(pts) >= 2:
-                xs, ys = zip(*pts)
-                self.ax.plot(xs, ys, "r--", lw=2, zorder=4)
+            # node -> first waypoint, the only part that changes every frame
+            if self.route_connector is None:
+                self.route_connector = Line2D(
+                    [], [], linestyle="--", lw=2, color="r", zorder=4
+                )
+            x, y = self.nodes[selected_node].pos
+            wx, wy = highlight_route.coords[0]
+            self.route_connector.set_data([x, wx], [y, wy])
+            self.ax.add_line(self.route_connector)
 
         # ===== buffer highlight =====
         for meta in buffer:
@@ -258,5 +339,3 @@ class CanvasView:
         self.ax.set_xlim(xlim)
         self.ax.set_ylim(ylim)
         self.ax.set_aspect("equal", adjustable="box")
-
-        self.ax.figure.canvas.draw_idle()
@@ -0,0 +1,187 @@
+import gzip
+from dataclasses import dataclass
+
+import numpy as np
+
+from .model import Area, NodeRegistry, TimeFrame
+
+
+@dataclass
+class CompactStats:
+    pos_in: int = 0
+    pos_out: int = 0
+    buffer_in: int = 0
+    buffer_out: int = 0
+    frames_in: int = 0
+    frames_out: int = 0
+    max_error: float = 0.0  # worst dropped pos sample vs the interpolated track
+
+
+# =====================================================
+# Trajectory simplification
+# =====================================================
+
+
+def simplify_tracks(track, t, x, y, tolerance):
+    """
+    Ramer–Douglas–Peucker on every track at once.
+
+    Samples are sorted by (track, t). The error of a sample is its distance
+    to the position linearly interpolated *in time* between the kept samples
+    around it, so a dropped sample is recovered by interpolating at its time.
+    Playback interpolates the same way (TrackStore), and both tracks are
+    straight between samples, so this is also the largest distance playback
+    of the simplified track shows at any time. Every pass splits all segments that are off by more than `tolerance` at
+    their worst sample, with array operations over all tracks.
+
+    Returns (keep mask, max error of the dropped samples).
+    """
+    n = len(t)
+    keep = np.zeros(n, dtype=bool)
+    if n == 0:
+        return keep, 0.0
+
+    # first and last sample of every track are always kept
+    starts = np.flatnonzero(np.r_[True, track[1:] != track[:-1]])
+    keep[starts] = True
+    keep[np.r_[starts[1:] - 1, n - 1]] = True
+
+    idx = np.arange(n)
+    while True:
+        kept = np.flatnonzero(keep)
+        seg = np.searchsorted(kept, idx, side="right") - 1
+        left = kept[seg]
+        right = kept[np.minimum(seg + 1, len(kept) - 1)]
+
+        dt = t[right] - t[left]
+        frac = np.divide(t - t[left], dt, out=np.zeros(n), where=dt > 0)
+        err = np.hypot(
+            x - (x[left] + frac * (x[right] - x[left])),
+            y - (y[left] + frac * (y[right] - y[left])),
+        )
+        err[keep] = 0.0
+
+        worst = np.maximum.reduceat(err, kept)
+        split = (err > tolerance) & (err == worst[seg])
+        if not split.any():
+            return keep, float(err.max())
+
+        # one sample per segment, the first of equally bad ones
+        _, first = np.unique(seg[split], return_index=True)
+        keep[np.flatnonzero(split)[first]] = True
+
+
+def compact_timeline(nodes: NodeRegistry, timeline: list[TimeFrame], tolerance):
+    """
+    Timeline without the pos samples that interpolation recovers within
+    `tolerance` and without buffer snapshots equal to the node's previous
+    one. Frames left empty by this are dropped.
+    """
+    stats = CompactStats(frames_in=len(timeline))
+
+    # ===== pos samples =====
+    pos_events = []
+    tracks = {}  # nid -> track number, undeclared nodes included
+    track, t, x, y = [], [], [], []
+    for tf in timeline:
+        for ev in tf.events:
+            if ev.type != "pos":
+                continue
+            d = ev.data
+            track.append(tracks.setdefault(d["node"], len(tracks)))
+            t.append(tf.time)
+            x.append(float(d["x"]))
+            y.append(float(d["y"]))
+            pos_events.append(ev)
+
+    track = np.array(track, dtype=np.int64)
+    t = np.array(t, dtype=float)
+    x = np.array(x, dtype=float)
+    y = np.array(y, dtype=float)
+
+    # group by node, stable so samples of a node stay in timeline order
+    order = np.argsort(track, kind="stable")
+    keep_sorted, stats.max_error = simplify_tracks(
+        track[order], t[order], x[order], y[order], tolerance
+    )
+    keep = np.empty_like(keep_sorted)
+    keep[order] = keep_sorted
+
+    dropped = {id(ev) for ev, k in zip(pos_events, keep.tolist()) if not k}
+    stats.pos_in = len(pos_events)
+    stats.pos_out = len(pos_events) - len(dropped)
+
+    # ===== buffers and frames =====
+    last_buffer = {}
+    out = []
+    for tf in timeline:
+        events = []
+        for ev in tf.events:
+            if ev.type == "pos" and id(ev) in dropped:
+                continue
+
+            if ev.type == "buffer":
+                stats.buffer_in += 1
+                nid = ev.data.get("node")
+                content = ev.data.get("list")
+                if nid in last_buffer and last_buffer[nid] == content:
+                    continue
+                last_buffer[nid] = content
+                stats.buffer_out += 1
+
+            events.append(ev)
+
+        # frames that were empty in the input stay
+        if events or not tf.events:
+            out.append(TimeFrame(tf.time, events))
+
+    stats.frames_out = len(out)
+    return out, stats
+
+
+# =====================================================
+# Writing
+# =====================================================
+
+
+def _num(v) -> str:
+    """Shortest text that parses back to the same float"""
+    s = repr(float(v))
+    return s[:-2] if s.endswith(".0") else s
+
+
+def _value(v) -> str:
+    """parse_kv turns a value into a list iff it contains "|" """
+    if isinstance(v, list):
+        return "|".join(v) + ("|" if len(v) < 2 else "")
+    return v
+
+
+def _fields(fields: dict) -> str:
+    return " ".join(f"{k}={_value(v)}" for k, v in fields.items())
+
+
+def write_trace(path, area: Area | None, nodes: NodeRegistry, timeline: list[TimeFrame]):
+    """Write a --Declare / --Events trace, gzip compressed if path ends in .gz"""
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "wt") as f:
+        f.write("--Declare\n")
+        if area is not None:
+            f.write(f"area={_num(area.width)}|{_num(area.height)}\n")
+
+        for nid in nodes.ids:
+            node = nodes[nid]
+            line = (
+                f"node={nid} type={node.type} group={node.group} "
+                f"color={'|'.join(map(str, node.color))} buffer={node.buffer_size}"
+            )
+            if node.ranges:
+                line += " range=" + _value([_num(r) for r in node.ranges])
+            f.write(line + "\n")
+
+        f.write("--Events\n")
+        for tf in timeline:
+            f.write(f"Time={_num(tf.time)}\n")
+            for ev in tf.events:
+                fields = ev.data if "event" in ev.data else {"event": ev.type, **ev.data}
+                f.write(_fields(fields) + "\n")
@@ -0,0 +1,191 @@
+import gzip
+import io
+import os
+import struct
+
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+# zstd skippable frames use magics 0x184D2A50..0x184D2A5F (the seek table
+# of the seekable format is one of them)
+ZSTD_SKIPPABLE_MASK = 0xFFFFFFF0
+ZSTD_SKIPPABLE_MAGIC = 0x184D2A50
+
+
+def _zstd():
+    try:
+        import zstandard
+    except ImportError:
+        raise RuntimeError(
+            "reading zstd compressed traces requires the 'zstandard' package"
+        )
+    return zstandard
+
+
+def detect_format(filename):
+    """Returns "gzip", "zstd" or "plain" based on the file magic"""
+    with open(filename, "rb") as f:
+        magic = f.read(4)
+
+    if magic.startswith(GZIP_MAGIC):
+        return "gzip"
+    if magic == ZSTD_MAGIC:
+        return "zstd"
+    return "plain"
+
+
+def open_trace(filename, fmt=None):
+    """Open a (possibly compressed) trace for reading as text"""
+    fmt = fmt or detect_format(filename)
+
+    if fmt == "gzip":
+        return gzip.open(filename, "rt", encoding="utf-8")
+
+    if fmt == "zstd":
+        dctx = _zstd().ZstdDecompressor()
+        raw = dctx.stream_reader(open(filename, "rb"), read_across_frames=True)
+        return io.TextIOWrapper(raw, encoding="utf-8")
+
+    return open(filename, "r")
+
+
+# =====================================================
+# Block index
+# =====================================================
+
+
+def _bgzf_blocks(f, size):
+    """
+    Member list of a BGZF file: every gzip member carries a "BC" extra
+    subfield holding its compressed size. None for ordinary gzip files.
+    """
+    blocks = []
+    offset = 0
+
+    while offset < size:
+        f.seek(offset)
+        header = f.read(12)
+        if len(header) < 12 or not header.startswith(GZIP_MAGIC):
+            return None
+
+        flags = header[3]
+        if not flags & 0x04:  # FEXTRA
+            return None
+
+        (xlen,) = struct.unpack("<H", header[10:12])
+        extra = f.read(xlen)
+
+        bsize = None
+        pos = 0
+        while pos + 4 <= len(extra):
+            si1, si2 = extra[pos], extra[pos + 1]
+            slen = struct.unpack("<H", extra[pos + 2 : pos + 4])[0]
+            if si1 == ord("B") and si2 == ord("C") and slen == 2:
+                bsize = struct.unpack("<H", extra[pos + 4 : pos + 6])[0]
+                break
+            pos += 4 + slen
+
+        if bsize is None:
+            return None
+
+        blocks.append((offset, bsize + 1))
+        offset += bsize + 1
+
+    return blocks
+
+
+def _zstd_blocks(f, size):
+    """
+    Frame list of a multi-frame zstd file, found by walking the frame
+    and block headers. Skippable frames (e.g. the seek table written by
+    the seekable format) are left out.
+    """
+    blocks = []
+    offset = 0
+
+    while offset < size:
+        f.seek(offset)
+        header = f.read(4)
+        if len(header) < 4:
+            return None
+        (magic,) = struct.unpack("<I", header)
+
+        if magic & ZSTD_SKIPPABLE_MASK == ZSTD_SKIPPABLE_MAGIC:
+            (frame_size,) = struct.unpack("<I", f.read(4))
+            offset += 8 + frame_size
+            continue
+
+        if magic != struct.unpack("<I", ZSTD_MAGIC)[0]:
+            return None
+
+        descriptor = f.read(1)[0]
+        fcs_flag = descriptor >> 6
+        single_segment = descriptor >> 5 & 1
+        has_checksum = descriptor >> 2 & 1
+        dict_id_flag = descriptor & 3
+
+        pos = offset + 5
+        pos += 0 if single_segment else 1  # window descriptor
+        pos += (0, 1, 2, 4)[dict_id_flag]
+        pos += (1 if single_segment else 0, 2, 4, 8)[fcs_flag]
+
+        while True:
+            f.seek(pos)
+            block = f.read(3)
+            if len(block) < 3:
+                return None
+            (bh,) = struct.unpack("<I", block + b"\0")
+            last = bh & 1
+            block_type = bh >> 1 & 3
+            block_size = bh >> 3
+
+            pos += 3 + (1 if block_type == 1 else block_size)  # RLE: one byte
+            if last:
+                break
+
+        if has_checksum:
+            pos += 4
+
+        blocks.append((offset, pos - offset))
+        offset = pos
+
+    return blocks
+
+
+def block_index(filename, fmt=None):
+    """
+    (offset, length) of the independently decompressible blocks of a
+    block-compressed trace (BGZF or multi-frame zstd). Returns None if
+    the file has to be decompressed as a single stream.
+    """
+    fmt = fmt or detect_format(filename)
+    size = os.path.getsize(filename)
+
+    with open(filename, "rb") as f:
+        if fmt == "gzip":
+            blocks = _bgzf_blocks(f, size)
+        elif fmt == "zstd":
+            blocks = _zstd_blocks(f, size)
+        else:
+            return None
+
+    if not blocks or len(blocks) < 2:
+        return None
+    return blocks
+
+
+def decompress(fmt, data):
+    """Decompress a run of consecutive gzip members / zstd frames"""
+    if fmt == "gzip":
+        return gzip.decompress(data)
+
+    if fmt == "zstd":
+        dctx = _zstd().ZstdDecompressor()
+        out = []
+        while data:
+            dobj = dctx.decompressobj()
+            out.append(dobj.decompress(data))
+            data = dobj.unused_data
+        return b"".join(out)
+
+    return data
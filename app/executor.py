@@ -1,37 +1,126 @@
+import numpy as np
+
+from .profiling import PROFILER
+
+# event type -> batch handler fn(executor, events)
+HANDLERS = {}
+
+# below this many events a plain loop beats building arrays
+SMALL_BATCH = 16
+
+
+def handler(*event_types):
+    """
+    Register `fn(executor, events)` as the handler of `event_types`.
+    It gets every event of its type in a frame (or a range of frames)
+    at once, in timeline order.
+    """
+
+    def register(fn):
+        for event_type in event_types:
+            HANDLERS[event_type] = fn
+        return fn
+
+    return register
+
+
 class EventExecutor:
-    def __init__(self, nodes, canvas):
+    """
+    Applies events to the node state. Events are grouped by type and every
+    group goes to its registered handler in one call; handlers of different
+    types touch disjoint state, so the grouping keeps the end state.
+
+    Positions are interpolated: after the handlers ran, every node with a
+    pos sample is placed between its last and next sample at the frame time.
+    """
+
+    def __init__(self, nodes, routes, tracks):
         self.nodes = nodes
-        self.canvas = canvas
+        self.routes = routes
+        self.tracks = tracks
+        self.unknown = set()  # types without handler, reported once
+
+    def apply_events(self, events, time):
+        """Apply the events of frames up to the one at `time`, shown next"""
+        with PROFILER.stage("apply_events"):
+            groups = {}
+            for ev in events:
+                group = groups.get(ev.type)
+                if group is None:
+                    groups[ev.type] = group = []
+                group.append(ev)
+
+            for event_type, group in groups.items():
+                fn = HANDLERS.get(event_type)
+                if fn is not None:
+                    fn(self, group)
+                elif event_type not in self.unknown:
+                    self.unknown.add(event_type)
+                    print(f"[WARN] No handler for event type {event_type!r}")
+
+            self._move(time)
+
+        PROFILER.count("events", len(events))
+
+    def apply_range(self, frames):
+        """Apply consecutive frames as one batch, only the last state per node lands"""
+        if frames:
+            events = [ev for tf in frames for ev in tf.events]
+            self.apply_events(events, frames[-1].time)
+
+    def _move(self, time):
+        nodes = self.nodes
+        moving = np.flatnonzero(nodes.sample >= 0)
+        if len(moving):
+            nodes.pos[moving] = self.tracks.positions(nodes.sample[moving], time)
+
+
+# =====================================================
+# Handlers
+# =====================================================
+
+
+def _last_per_node(events, key="node"):
+    """Last event of every node, in order of their last appearance"""
+    return {ev.data[key]: ev for ev in events}.values()
+
+
+@handler("pos")
+def apply_pos(executor, events):
+    """Only records the last sample, apply_events then moves the nodes"""
+    nodes = executor.nodes
+    samples = executor.tracks.samples
 
-    def apply_events(self, events):
+    if len(events) <= SMALL_BATCH:
         for ev in events:
-            self.apply(ev)
+            nodes.sample[nodes.index[ev.data["node"]]] = samples[id(ev)]
+        return
 
-    def apply(self, ev):
-        d = ev.data
-        t = ev.type
+    events = list(_last_per_node(events))
+    idx = np.fromiter(
+        (nodes.index[ev.data["node"]] for ev in events), dtype=np.intp, count=len(events)
+    )
+    nodes.sample[idx] = np.fromiter(
+        (samples[id(ev)] for ev in events), dtype=np.int64, count=len(events)
+    )
 
-        if t == "pos":
-            self.nodes[d["node"]].pos = (float(d["x"]), float(d["y"]))
 
-        elif t == "route":
-            self.nodes[d["node"]].route = d["tour"]
+@handler("route")
+def apply_route(executor, events):
+    for ev in _last_per_node(events):
+        executor.nodes[ev.data["node"]].route = executor.routes.get(ev)
 
-        elif t == "buffer":
-            n = self.nodes[d["node"]]
-            n.buffer = [x for x in d["list"] if x != ""]
 
-        elif t == "send":
-            self.draw_send(d)
+@handler("buffer")
+def apply_buffer(executor, events):
+    for ev in _last_per_node(events):
+        content = ev.data.get("list", [])
+        # parse_kv only makes a list of values containing "|"
+        if isinstance(content, str):
+            content = [content]
+        executor.nodes[ev.data["node"]].buffer = [x for x in content if x != ""]
 
-    def draw_send(self, d):
-        src = self.nodes[d["source"]]
-        dst = self.nodes[d["dest"]]
 
-        self.canvas.ax.annotate(
-            d.get("meta", ""),
-            xy=dst.pos,
-            xytext=src.pos,
-            arrowprops=dict(arrowstyle="->", lw=1, color="blue"),
-            zorder=5,
-        )
+@handler("send", "beacon", "trip")
+def apply_stateless(executor, events):
+    """No node state to update, CanvasView draws sends / beacons of the shown frame"""
@@ -0,0 +1,194 @@
+import os
+import queue
+import select
+import socket
+import stat
+import threading
+import time
+
+from .parser import FrameBuilder, merge_frames, parse_declare_fields
+
+
+class TraceFollower:
+    """
+    Incrementally read a trace that is still being written.
+
+    The source can be a regular file (polled for appended data), a named
+    pipe or a unix socket. Existing content is parsed once by `load()`,
+    afterwards a background thread reads only the new bytes and pushes
+    completed TimeFrames into a queue that the UI drains with `poll()`.
+    """
+
+    def __init__(self, path, poll_interval=0.2, chunk_size=65536):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.chunk_size = chunk_size
+
+        self.frames = queue.Queue()
+        self.finished = threading.Event()
+
+        self._file = None
+        self._fd = None
+        self._sock = None
+        self._thread = None
+        self._stop = threading.Event()
+
+        # parser state
+        self._partial = b""
+        self._builder = FrameBuilder()
+
+    # =====================================================
+    # Source
+    # =====================================================
+
+    def _open(self):
+        mode = os.stat(self.path).st_mode
+
+        if stat.S_ISSOCK(mode):
+            self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._sock.connect(self.path)
+        elif stat.S_ISFIFO(mode):
+            # blocks until a writer opens the other end
+            self._fd = os.open(self.path, os.O_RDONLY)
+        else:
+            self._file = open(self.path, "rb")
+
+    def _read_chunk(self):
+        """
+        Returns new bytes, b"" if nothing is available right now,
+        or None once the writer closed a pipe / socket.
+        """
+        if self._file is not None:
+            return self._file.read(self.chunk_size)
+
+        src = self._sock if self._sock is not None else self._fd
+        ready, _, _ = select.select([src], [], [], self.poll_interval)
+        if not ready:
+            return b""
+
+        if self._sock is not None:
+            data = self._sock.recv(self.chunk_size)
+        else:
+            data = os.read(self._fd, self.chunk_size)
+
+        return data if data else None
+
+    def _close(self):
+        if self._file is not None:
+            self._file.close()
+        if self._fd is not None:
+            os.close(self._fd)
+        if self._sock is not None:
+            self._sock.close()
+
+    # =====================================================
+    # Parsing
+    # =====================================================
+
+    def _feed(self, data):
+        """Parse complete lines of `data`, keep the trailing partial line"""
+        data = self._partial + data
+        lines = data.split(b"\n")
+        self._partial = lines.pop()
+
+        for raw in lines:
+            line = raw.decode("utf-8").strip()
+            if line:
+                self._builder.line(line)
+
+        return self._builder.take()
+
+    def _flush(self, eof=False):
+        """
+        Emit the pending frame once the reader caught up with the writer.
+        More events with the same time may still follow, the consumer
+        merges them into its last frame.
+        """
+        if eof:
+            if self._partial:
+                self._feed(b"\n")
+            self._builder.finish()
+        else:
+            self._builder.flush()
+        return self._builder.take()
+
+    # =====================================================
+    # Public API
+    # =====================================================
+
+    def load(self):
+        """
+        Read everything that already exists and return (area, nodes, timeline).
+        Blocks until the declare section and at least one frame are available.
+        """
+        self._open()
+
+        timeline = []
+        while True:
+            data = self._read_chunk()
+            if data is None:
+                timeline.extend(self._flush(eof=True))
+                self.finished.set()
+                break
+
+            if data:
+                timeline.extend(self._feed(data))
+                continue
+
+            # caught up with the writer
+            if self._builder.mode == "events":
+                timeline.extend(self._flush())
+                if timeline:
+                    break
+            if self._file is not None:
+                time.sleep(self.poll_interval)
+
+        if not timeline:
+            raise ValueError(f"{self.path}: trace contains no events")
+
+        timeline.sort(key=lambda tf: tf.time)
+
+        area, nodes = parse_declare_fields(self._builder.declares)
+        return area, nodes, merge_frames(timeline)
+
+    def start(self):
+        if self.finished.is_set():
+            return
+
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+        self._close()
+
+    def poll(self):
+        """Return all frames read since the last call"""
+        frames = []
+        while True:
+            try:
+                frames.append(self.frames.get_nowait())
+            except queue.Empty:
+                return frames
+
+    def _run(self):
+        while not self._stop.is_set():
+            data = self._read_chunk()
+            if data is None:
+                for tf in self._flush(eof=True):
+                    self.frames.put(tf)
+                self.finished.set()
+                return
+
+            if data:
+                for tf in self._feed(data):
+                    self.frames.put(tf)
+                continue
+
+            for tf in self._flush():
+                self.frames.put(tf)
+            if self._file is not None:
+                time.sleep(self.poll_interval)
+
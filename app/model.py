@@ -1,4 +1,6 @@
-from dataclasses import dataclass, field
+from dataclasses import dataclass
+
+import numpy as np
 
 
 @dataclass
@@ -7,18 +9,194 @@ class Area:
     height: float
 
 
-@dataclass
+def _grow(arr):
+    """arr with one more zeroed row, same dtype"""
+    return np.concatenate([arr, np.zeros((1,) + arr.shape[1:], dtype=arr.dtype)])
+
+
+class NodeRegistry(dict):
+    """
+    nid -> Node mapping that also assigns every node a dense integer index
+    at declare time. Per node state that gets updated while playing lives
+    in contiguous arrays indexed by it:
+
+    - pos: (n, 2) float positions
+    - sample: number of the last applied pos sample in a TrackStore, -1 if none
+    - buffer_count: number of bundles in the buffer
+    - buffer_size: buffer capacity
+    - type_code: index into `types`
+    - color: (n, 3) rgb in 0..255
+
+    Variable length state (buffer contents, ranges, current Route) is kept
+    in per index lists.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.ids = []  # index -> nid
+        self.index = {}  # nid -> index
+        self.types = []  # type code -> type name
+
+        self.pos = np.zeros((0, 2))
+        self.sample = np.zeros(0, dtype=np.int64)
+        self.buffer_count = np.zeros(0, dtype=np.int32)
+        self.buffer_size = np.zeros(0, dtype=np.int32)
+        self.type_code = np.zeros(0, dtype=np.int8)
+        self.color = np.zeros((0, 3))
+
+        self.groups = []
+        self.ranges = []
+        self.buffers = []
+        self.routes = []
+
+    def add(self, nid, type, group, color, buffer_size, ranges=None):
+        """Declare a node (a redeclared nid keeps its index) and return its view"""
+        if type not in self.types:
+            self.types.append(type)
+
+        idx = self.index.get(nid)
+        if idx is None:
+            idx = len(self.ids)
+            self.ids.append(nid)
+            self.index[nid] = idx
+
+            self.pos = _grow(self.pos)
+            self.sample = _grow(self.sample)
+            self.buffer_count = _grow(self.buffer_count)
+            self.buffer_size = _grow(self.buffer_size)
+            self.type_code = _grow(self.type_code)
+            self.color = _grow(self.color)
+            self.groups.append(0)
+            self.ranges.append([])
+            self.buffers.append([])
+            self.routes.append(None)
+
+        self.pos[idx] = (0.0, 0.0)
+        self.sample[idx] = -1
+        self.buffer_count[idx] = 0
+        self.buffer_size[idx] = buffer_size
+        self.type_code[idx] = self.types.index(type)
+        self.color[idx] = color
+        self.groups[idx] = group
+        self.ranges[idx] = list(ranges or [])
+        self.buffers[idx] = []
+        self.routes[idx] = None
+
+        node = Node(self, idx)
+        self[nid] = node
+        return node
+
+    def copy(self):
+        """
+        Registry with its own playback state (positions, buffers, routes);
+        declare-time lists are shared with this one.
+        """
+        other = NodeRegistry()
+        other.ids = self.ids
+        other.index = self.index
+        other.types = self.types
+        other.groups = self.groups
+        other.ranges = self.ranges
+
+        other.buffer_size = self.buffer_size
+        other.type_code = self.type_code
+        other.color = self.color
+
+        other.restore(self.snapshot())
+        for nid, idx in self.index.items():
+            other[nid] = Node(other, idx)
+        return other
+
+    def snapshot(self):
+        """Copy of the playback state, for restore()"""
+        # buffers / routes entries are replaced, never mutated in place
+        return (
+            self.pos.copy(),
+            self.sample.copy(),
+            self.buffer_count.copy(),
+            list(self.buffers),
+            list(self.routes),
+        )
+
+    def restore(self, snap):
+        pos, sample, buffer_count, buffers, routes = snap
+        self.pos = pos.copy()
+        self.sample = sample.copy()
+        self.buffer_count = buffer_count.copy()
+        self.buffers = list(buffers)
+        self.routes = list(routes)
+
+    def rgb(self):
+        """Colors in 0..1, as matplotlib expects them"""
+        return self.color / 255
+
+    def is_type(self, type):
+        if type not in self.types:
+            return np.zeros(len(self.ids), dtype=bool)
+        return self.type_code == self.types.index(type)
+
+
 class Node:
-    nid: str
-    type: str
-    group: int
-    color: tuple
-    buffer_size: int
-    ranges: list = field(default_factory=list)
-
-    pos: tuple = (0.0, 0.0)
-    buffer: list = field(default_factory=list)
-    route: list = field(default_factory=list)
+    """Lightweight view of one node of a NodeRegistry"""
+
+    __slots__ = ("registry", "idx")
+
+    def __init__(self, registry: NodeRegistry, idx: int):
+        self.registry = registry
+        self.idx = idx
+
+    def __repr__(self):
+        return f"Node(nid={self.nid!r}, type={self.type!r}, pos={self.pos})"
+
+    @property
+    def nid(self) -> str:
+        return self.registry.ids[self.idx]
+
+    @property
+    def type(self) -> str:
+        return self.registry.types[self.registry.type_code[self.idx]]
+
+    @property
+    def group(self) -> int:
+        return self.registry.groups[self.idx]
+
+    @property
+    def color(self) -> tuple:
+        return tuple(int(v) for v in self.registry.color[self.idx])
+
+    @property
+    def buffer_size(self) -> int:
+        return int(self.registry.buffer_size[self.idx])
+
+    @property
+    def ranges(self) -> list:
+        return self.registry.ranges[self.idx]
+
+    @property
+    def pos(self) -> tuple:
+        x, y = self.registry.pos[self.idx]
+        return (float(x), float(y))
+
+    @pos.setter
+    def pos(self, value):
+        self.registry.pos[self.idx] = value
+
+    @property
+    def buffer(self) -> list:
+        return self.registry.buffers[self.idx]
+
+    @buffer.setter
+    def buffer(self, value):
+        self.registry.buffers[self.idx] = value
+        self.registry.buffer_count[self.idx] = len(value)
+
+    @property
+    def route(self):
+        return self.registry.routes[self.idx]
+
+    @route.setter
+    def route(self, value):
+        self.registry.routes[self.idx] = value
 
 
 @dataclass
@@ -0,0 +1,261 @@
+import re
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+from .compression import decompress
+from .profiling import PROFILER
+from .parser import (
+    EVENT_LINE,
+    FAST_EVENTS,
+    OTHER_GROUP,
+    TIME_GROUP,
+    FrameBuilder,
+    merge_frames,
+    parse_declare_fields,
+    parse_kv,
+)
+
+# record kinds of a tokenized line
+DECLARE_MARK = 0
+EVENTS_MARK = 1
+TIME = 2
+EVENT = 3
+OTHER = 4
+
+RECORD_RUN = re.compile(rb"\x03+|[^\x03]", re.S)
+
+# separates keys / values inside TokenChunk.tokens
+SEP = "\x00"
+
+
+class TokenChunk:
+    """
+    Tokenized run of trace lines, in a compact form that is cheap to send
+    back from a worker process:
+
+    - kinds: one record kind per non empty line
+    - times: value of every TIME record
+    - shapes: distinct key tuples of the EVENT records
+    - shape_ids: index into shapes of every EVENT record
+    - tokens: values of all EVENT records joined by SEP
+    - list_slots: indices (into the split tokens) of "|" separated values
+    - others: raw text of OTHER records (declarations, malformed lines)
+
+    Lines are tokenized without knowing which section they belong to, the
+    section state is applied when the chunks are assembled in order.
+    head / tail hold the partial lines at the chunk edges.
+    """
+
+    __slots__ = (
+        "head",
+        "tail",
+        "kinds",
+        "times",
+        "shapes",
+        "shape_ids",
+        "tokens",
+        "list_slots",
+        "others",
+    )
+
+    def __init__(self):
+        self.head = b""
+        self.tail = b""
+        self.kinds = array("b")
+        self.times = array("d")
+        self.shapes = []
+        self.shape_ids = array("H")
+        self.tokens = ""
+        self.list_slots = array("L")
+        self.others = []
+
+
+def tokenize_text(text):
+    chunk = TokenChunk()
+    chunk.shapes = [keys for _, _, keys in FAST_EVENTS]
+    shape_index = {shape: sid for sid, shape in enumerate(chunk.shapes)}
+    fast = [(sid, start, end) for sid, (start, end, _) in enumerate(FAST_EVENTS)]
+    tokens = []
+
+    for g in EVENT_LINE.findall(text):
+        for sid, start, end in fast:
+            if g[start]:
+                chunk.kinds.append(EVENT)
+                chunk.shape_ids.append(sid)
+                tokens.extend(g[start:end])
+                break
+        else:
+            if g[TIME_GROUP]:
+                try:
+                    chunk.times.append(float(g[TIME_GROUP]))
+                    chunk.kinds.append(TIME)
+                except ValueError:
+                    # let the assembler fail the same way the serial parser does
+                    chunk.kinds.append(OTHER)
+                    chunk.others.append("Time=" + g[TIME_GROUP])
+                continue
+
+            line = g[OTHER_GROUP].strip()
+            if not line:
+                continue
+
+            if line.startswith("--Declare"):
+                chunk.kinds.append(DECLARE_MARK)
+                continue
+            elif line.startswith("--Events"):
+                chunk.kinds.append(EVENTS_MARK)
+                continue
+
+            fields = parse_kv(line)
+            if "event" not in fields or line.startswith(("--", "Time=")):
+                chunk.kinds.append(OTHER)
+                chunk.others.append(line)
+                continue
+
+            shape = tuple(fields)
+            sid = shape_index.get(shape)
+            if sid is None:
+                sid = shape_index[shape] = len(chunk.shapes)
+                chunk.shapes.append(shape)
+
+            chunk.kinds.append(EVENT)
+            chunk.shape_ids.append(sid)
+            for v in fields.values():
+                if isinstance(v, list):
+                    chunk.list_slots.append(len(tokens))
+                    v = "|".join(v)
+                tokens.append(v)
+
+    chunk.tokens = SEP.join(tokens)
+    return chunk
+
+
+def _decode(data):
+    # same universal newlines as reading the trace in text mode
+    return data.decode("utf-8").replace("\r\n", "\n").replace("\r", "\n")
+
+
+def tokenize_block(data):
+    """Tokenize the complete lines of `data`, keep the edges as head / tail"""
+    first = data.find(b"\n")
+    if first == -1:
+        chunk = TokenChunk()
+        chunk.head = data
+        chunk.tail = None  # no line break at all
+        return chunk
+
+    last = data.rfind(b"\n")
+    chunk = tokenize_text(_decode(data[first + 1 : last]))
+    chunk.head = data[:first]
+    chunk.tail = data[last + 1 :]
+    return chunk
+
+
+def stitch(chunks):
+    """Tokenize the lines spanning chunk edges, yield chunks in file order"""
+    carry = b""
+    for chunk in chunks:
+        if chunk.tail is None:
+            carry += chunk.head
+            continue
+
+        yield tokenize_text(_decode(carry + chunk.head))
+        yield chunk
+        carry = chunk.tail
+
+    if carry:
+        yield tokenize_text(_decode(carry))
+
+
+def _chunk_events(chunk):
+    """Fields of every EVENT record of the chunk"""
+    # every EVENT record has at least its "event" value, which may be ""
+    flat = chunk.tokens.split(SEP) if chunk.shape_ids else []
+    for i in chunk.list_slots:
+        flat[i] = [x for x in flat[i].split("|") if x != ""]
+
+    # zip stops on the exhausted key tuple without consuming a value
+    values = iter(flat)
+    shapes = chunk.shapes
+    return [dict(zip(shapes[sid], values)) for sid in chunk.shape_ids]
+
+
+def assemble(chunks):
+    """Feed tokenized chunks through the section / time state machine"""
+    builder = FrameBuilder()
+
+    for chunk in chunks:
+        fields = _chunk_events(chunk)
+        times = iter(chunk.times)
+        others = iter(chunk.others)
+        pos = 0
+
+        # runs of EVENT records are handled as a whole
+        for m in RECORD_RUN.finditer(chunk.kinds.tobytes()):
+            kind = m.group()[0]
+
+            if kind == EVENT:
+                end = pos + len(m.group())
+                builder.add_fields(fields[pos:end])
+                pos = end
+            elif kind == TIME:
+                builder.time(next(times))
+            elif kind == OTHER:
+                builder.line(next(others))
+            elif kind == DECLARE_MARK:
+                builder.section("declare")
+            elif kind == EVENTS_MARK:
+                builder.section("events")
+
+    builder.finish()
+    timeline = builder.timeline
+    timeline.sort(key=lambda tf: tf.time)
+
+    area, nodes = parse_declare_fields(builder.declares)
+    return area, nodes, merge_frames(timeline)
+
+
+# =====================================================
+# Compressed traces
+# =====================================================
+
+
+def _tokenize_compressed(task):
+    filename, fmt, offset, length = task
+
+    with open(filename, "rb") as f:
+        f.seek(offset)
+        data = f.read(length)
+
+    return tokenize_block(decompress(fmt, data))
+
+
+def _group_blocks(blocks, n_groups):
+    """Merge adjacent blocks into about `n_groups` (offset, length) ranges"""
+    total = sum(length for _, length in blocks)
+    target = total / n_groups
+
+    groups = []
+    start, size = blocks[0]
+    for offset, length in blocks[1:]:
+        if size >= target or offset != start + size:
+            groups.append((start, size))
+            start, size = offset, length
+        else:
+            size += length
+    groups.append((start, size))
+
+    return groups
+
+
+def parse_blocks_parallel(filename, fmt, blocks, workers):
+    tasks = [
+        (filename, fmt, offset, length)
+        for offset, length in _group_blocks(blocks, workers * 4)
+    ]
+
+    with PROFILER.stage("tokenize"), ProcessPoolExecutor(workers) as pool:
+        chunks = list(pool.map(_tokenize_compressed, tasks))
+
+    with PROFILER.stage("assemble"):
+        return assemble(stitch(chunks))
@@ -1,4 +1,15 @@
+import gc
+import os
+import re
+
+from .compression import block_index, detect_format, open_trace
 from .model import *
+from .profiling import PROFILER
+
+# below this size starting a process pool costs more than it saves
+PARALLEL_MIN_COMPRESSED_SIZE = 1024 * 1024
+
+SECTION_LINE = re.compile(r"^[^\S\n]*--(Declare|Events).*$", re.M)
 
 
 def parse_kv(line: str):
@@ -15,17 +26,68 @@ def parse_kv(line: str):
     return result
 
 
-def parse_declare(lines):
-    area = None
-    nodes = {}
+# One line of the events section. pos / send / beacon lines have a fixed
+# shape and get a specialized branch, so the bulk of a trace is tokenized
+# by a single regex pass instead of parse_kv. Well formed Time= lines are
+# captured too, anything else is captured whole (OTHER_GROUP).
+EVENT_LINE = re.compile(
+    r"^[ \t\r]*(?:"
+    r"event=(pos) node=([^\s|]*) x=([^\s|]*) y=([^\s|]*)"
+    r"|event=(send) source=([^\s|]*) dest=([^\s|]*) meta=([^\s|]*)"
+    r"|event=(beacon) node=([^\s|]*)"
+    r"|Time=([^\s=|]+)"
+    r"|(.*?)"
+    r")[ \t\r]*$",
+    re.M,
+)
+
+# (first group, end group, keys) of every fast path branch
+FAST_EVENTS = (
+    (0, 4, ("event", "node", "x", "y")),
+    (4, 8, ("event", "source", "dest", "meta")),
+    (8, 10, ("event", "node")),
+)
+TIME_GROUP = 10
+OTHER_GROUP = 11
+
 
+def fast_fields(g):
+    """Fields of a pos / send / beacon line from its EVENT_LINE groups, else None"""
+    if g[0]:
+        return {"event": "pos", "node": g[1], "x": g[2], "y": g[3]}
+    if g[4]:
+        return {"event": "send", "source": g[5], "dest": g[6], "meta": g[7]}
+    if g[8]:
+        return {"event": "beacon", "node": g[9]}
+    return None
+
+
+def parse_fields(line: str):
+    """parse_kv for a stripped event line, using the fast paths if possible"""
+    fields = fast_fields(EVENT_LINE.match(line).groups())
+    if fields is not None:
+        return fields
+
+    return parse_kv(line)
+
+
+def parse_declare(lines):
+    declares = []
     for line in lines:
         line = line.strip()
         if not line or line.startswith("--"):
             continue
 
-        fields = parse_kv(line)
+        declares.append(parse_kv(line))
 
+    return parse_declare_fields(declares)
+
+
+def parse_declare_fields(declares):
+    area = None
+    nodes = NodeRegistry()
+
+    for fields in declares:
         if "area" in fields:
             w, h = map(float, fields["area"])
             area = Area(w, h)
@@ -39,7 +101,7 @@ def parse_declare(lines):
             if "range" in fields:
                 ranges = list(map(float, fields["range"]))
 
-            nodes[nid] = Node(
+            nodes.add(
                 nid=nid,
                 type=fields["type"],
                 group=int(fields.get("group", 0)),
@@ -51,32 +113,121 @@ def parse_declare(lines):
     return area, nodes
 
 
+class FrameBuilder:
+    """
+    Section / Time state machine shared by the serial, parallel and live
+    parsers. Lines are fed in file order, completed frames collect in
+    `timeline` and declaration fields in `declares`.
+    """
+
+    def __init__(self, mode=None):
+        self.mode = mode
+        self.declares = []
+        self.timeline = []
+        self.current_time = None
+        self.events = []  # events of the open frame
+
+    def section(self, mode):
+        self.mode = mode
+
+    def time(self, t):
+        if self.mode != "events":
+            return
+        # events before the first Time= line are dropped
+        if self.current_time is not None:
+            self.timeline.append(TimeFrame(self.current_time, self.events))
+        self.current_time = t
+        self.events = []
+
+    def add_fields(self, fields_list):
+        """Fields of tokenized event lines"""
+        if self.mode == "events":
+            self.events.extend(Event(f["event"], f) for f in fields_list)
+        elif self.mode == "declare":
+            self.declares.extend(fields_list)
+
+    def line(self, line):
+        """Any stripped, non empty line"""
+        if line.startswith("--Declare"):
+            self.mode = "declare"
+        elif line.startswith("--Events"):
+            self.mode = "events"
+
+        elif self.mode == "events":
+            if line.startswith("Time="):
+                self.time(float(line.split("=")[1]))
+                return
+
+            fields = parse_fields(line)
+            if "event" in fields:
+                self.events.append(Event(fields["event"], fields))
+
+        elif self.mode == "declare" and not line.startswith("--"):
+            self.declares.append(parse_kv(line))
+
+    def flush(self):
+        """
+        Close the open frame if it has events, later events with the same
+        time go to a new frame that the consumer merges. Events before the
+        first Time= line are kept back, time() drops them.
+        """
+        if self.events and self.current_time is not None:
+            self.timeline.append(TimeFrame(self.current_time, self.events))
+            self.events = []
+
+    def finish(self):
+        if self.current_time is not None:
+            self.timeline.append(TimeFrame(self.current_time, self.events))
+        self.current_time = None
+        self.events = []
+
+    def take(self):
+        """Frames completed since the last call"""
+        frames = self.timeline
+        self.timeline = []
+        return frames
+
+
 def parse_events(lines):
-    timeline = []
-    current_time = None
-    current_events = []
+    return parse_events_text("\n".join(lines))
 
-    for line in lines:
-        line = line.strip()
-        if not line:
-            continue
 
-        if line.startswith("Time="):
-            if current_time is not None:
-                timeline.append(TimeFrame(current_time, current_events))
-            current_time = float(line.split("=")[1])
-            current_events = []
-            continue
+def parse_events_text(text):
+    builder = FrameBuilder(mode="events")
+    events = builder.events
+    kv_lines = 0  # lines that needed the generic parse_kv
+
+    with PROFILER.stage("tokenize"):
+        for g in EVENT_LINE.findall(text):
+            fields = fast_fields(g)
+            if fields is not None:
+                events.append(Event(fields["event"], fields))
+                continue
+
+            if g[TIME_GROUP]:
+                builder.time(float(g[TIME_GROUP]))
+            else:
+                line = g[OTHER_GROUP].strip()
+                if not line:
+                    continue
+                if not line.startswith("Time="):
+                    kv_lines += 1
+                builder.line(line)
+            events = builder.events
+
+        builder.finish()
+        timeline = builder.timeline
+
+    PROFILER.count("parse_kv", kv_lines)
 
-        fields = parse_kv(line)
-        if "event" in fields:
-            current_events.append(Event(fields["event"], fields))
+    with PROFILER.stage("sort"):
+        timeline.sort(key=lambda tf: tf.time)
 
-    if current_time is not None:
-        timeline.append(TimeFrame(current_time, current_events))
+    with PROFILER.stage("merge"):
+        return merge_frames(timeline)
 
-    timeline.sort(key=lambda tf: tf.time)
 
+def merge_frames(timeline):
     merged = []  # merge timeFrame with equam times
     for tf in timeline:
         if not merged or merged[-1].time != tf.time:
@@ -85,33 +236,63 @@ def parse_events(lines):
             merged[-1].events.extend(tf.events)
 
     return merged
-    # return timeline
 
 
-def parse_log_file(filename):
-    declare_lines = []
-    event_lines = []
+def parse_log_file(filename, workers=None):
+    """
+    Parse a plain, gzip or zstd compressed trace. With `workers` > 1,
+    block-compressed traces (BGZF, multi-frame zstd) are decompressed and
+    tokenized by that many processes. The default is 1: the parent still
+    builds every Event, so see scripts/bench_parser.py before opting in.
+    """
+    # the timeline is millions of small, acyclic objects: cyclic GC passes
+    # triggered while building it only cost time
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        with PROFILER.stage("parse"):
+            return _parse_log_file(filename, workers)
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+
+def _parse_log_file(filename, workers):
+    from .parallel import parse_blocks_parallel
+
+    fmt = detect_format(filename)
+    workers = workers or 1
+
+    if fmt != "plain" and workers > 1:
+        if os.path.getsize(filename) >= PARALLEL_MIN_COMPRESSED_SIZE:
+            blocks = block_index(filename, fmt)
+            if blocks:
+                return parse_blocks_parallel(filename, fmt, blocks, workers)
+
+    declare_parts = []
+    event_parts = []
     mode = None
 
-    with open(filename, "r") as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
+    with PROFILER.stage("read"), open_trace(filename, fmt) as f:
+        text = f.read()
 
-            if line.startswith("--Declare"):
-                mode = "declare"
-                continue
-            elif line.startswith("--Events"):
-                mode = "events"
-                continue
+    # the text between section markers goes to the current section
+    start = 0
+    for m in SECTION_LINE.finditer(text):
+        if mode == "declare":
+            declare_parts.append(text[start : m.start()])
+        elif mode == "events":
+            event_parts.append(text[start : m.start()])
+
+        mode = m.group(1).lower()
+        start = m.end()
 
-            if mode == "declare":
-                declare_lines.append(line)
-            elif mode == "events":
-                event_lines.append(line)
+    if mode == "declare":
+        declare_parts.append(text[start:])
+    elif mode == "events":
+        event_parts.append(text[start:])
 
-    area, nodes = parse_declare(declare_lines)
-    timeline = parse_events(event_lines)
+    area, nodes = parse_declare("\n".join(declare_parts).split("\n"))
+    timeline = parse_events_text("\n".join(event_parts))
 
     return area, nodes, timeline
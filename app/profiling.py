@@ -0,0 +1,133 @@
+import json
+import time
+from collections import defaultdict, deque
+
+
+class _Stage:
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.frame_ns[self.name] += time.perf_counter_ns() - self.start
+        return False
+
+
+class _NullStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_STAGE = _NullStage()
+
+
+class Profiler:
+    """
+    Stage timers and counters, accumulated per displayed frame.
+
+    Disabled (the default) `stage()` hands out a shared no-op context and
+    `count()` returns immediately, so instrumented code pays one method call.
+    Enabled, every `end_frame()` pushes the frame's numbers into rolling
+    windows (for the HUD) and appends one JSON line to the timing log.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.window = 60
+        self.log = None
+
+        self.frame_ns = defaultdict(int)
+        self.frame_counts = defaultdict(int)
+
+        self.history = {}  # stage -> rolling ms per frame
+        self.count_history = {}  # counter -> rolling count per frame
+        self.totals = defaultdict(int)
+
+    def enable(self, log_path=None, window=60):
+        self.enabled = True
+        self.window = window
+        if log_path:
+            self.log = open(log_path, "w")
+
+    def close(self):
+        self.enabled = False
+        if self.log is not None:
+            self.log.close()
+            self.log = None
+
+    # =====================================================
+    # Recording
+    # =====================================================
+
+    def stage(self, name):
+        if not self.enabled:
+            return NULL_STAGE
+        return _Stage(self, name)
+
+    def count(self, name, n=1):
+        if self.enabled:
+            self.frame_counts[name] += n
+
+    def end_frame(self, **info):
+        """Close the current frame, `info` is written along with the timings"""
+        if not self.enabled:
+            return
+
+        for name in self.frame_ns.keys() - self.history.keys():
+            self.history[name] = deque(maxlen=self.window)
+        for name, hist in self.history.items():
+            hist.append(self.frame_ns.get(name, 0) / 1e6)
+
+        for name in self.frame_counts.keys() - self.count_history.keys():
+            self.count_history[name] = deque(maxlen=self.window)
+        for name, hist in self.count_history.items():
+            n = self.frame_counts.get(name, 0)
+            hist.append(n)
+            self.totals[name] += n
+
+        self.record(**info)
+
+    def record(self, **info):
+        """Log and reset the current timings without adding them to the HUD"""
+        if not self.enabled:
+            return
+
+        if self.log is not None:
+            record = dict(info)
+            record["ms"] = {k: v / 1e6 for k, v in self.frame_ns.items()}
+            record["counts"] = dict(self.frame_counts)
+            self.log.write(json.dumps(record) + "\n")
+
+        self.frame_ns.clear()
+        self.frame_counts.clear()
+
+    # =====================================================
+    # Reporting
+    # =====================================================
+
+    def rolling_ms(self):
+        """Mean ms per frame of every stage over the rolling window"""
+        return {
+            name: sum(hist) / len(hist) for name, hist in self.history.items() if hist
+        }
+
+    def hud_text(self):
+        lines = [f"{name:<13}{ms:8.2f} ms" for name, ms in self.rolling_ms().items()]
+        for name, hist in self.count_history.items():
+            mean = sum(hist) / len(hist) if hist else 0
+            lines.append(f"{name:<13}{mean:8.1f} /frame  {self.totals[name]} total")
+        return "\n".join(lines)
+
+
+PROFILER = Profiler()
@@ -0,0 +1,82 @@
+import itertools
+
+import numpy as np
+
+from .model import Event, NodeRegistry, TimeFrame
+
+_versions = itertools.count(1)
+
+
+class Route:
+    """
+    Geometry of one `route` event, parsed once at load time.
+
+    - coords: (n, 2) waypoint coordinates
+    - cumdist: distance along the tour up to every waypoint
+    - length: length of the closed tour (back to the first waypoint)
+    - version: unique per route, lets the canvas skip unchanged lines
+    """
+
+    __slots__ = ("node", "coords", "cumdist", "length", "version")
+
+    def __init__(self, node: str, coords: np.ndarray):
+        self.node = node
+        self.coords = coords
+        self.version = next(_versions)
+
+        steps = np.hypot(*np.diff(coords, axis=0).T) if len(coords) else []
+        self.cumdist = np.concatenate([[0.0], np.cumsum(steps)])[: len(coords)]
+
+        closing = np.hypot(*(coords[0] - coords[-1])) if len(coords) else 0.0
+        self.length = float(self.cumdist[-1] + closing) if len(coords) else 0.0
+
+    def __len__(self):
+        return len(self.coords)
+
+
+class RouteStore:
+    """
+    Route geometry of every `route` event of a timeline.
+
+    Waypoints are either "x:y" coordinates or node ids; node ids are
+    resolved against the node's last `pos` before the route event.
+    """
+
+    def __init__(self, nodes: NodeRegistry):
+        self.nodes = nodes
+        self.routes = {}  # id(event) -> Route
+
+        # positions as seen while scanning the timeline
+        self._pos = {}
+
+    def add_frames(self, frames: list[TimeFrame]):
+        """Parse the routes of `frames`, which must follow the ones already added"""
+        for tf in frames:
+            for ev in tf.events:
+                if ev.type == "pos":
+                    self._pos[ev.data["node"]] = (
+                        float(ev.data["x"]),
+                        float(ev.data["y"]),
+                    )
+                elif ev.type == "route":
+                    self.routes[id(ev)] = self._parse(ev)
+
+    def get(self, ev: Event) -> Route:
+        return self.routes[id(ev)]
+
+    def _parse(self, ev: Event) -> Route:
+        tour = ev.data.get("tour", [])
+        if isinstance(tour, str):
+            tour = [tour]
+
+        coords = []
+        for waypoint in tour:
+            if ":" in waypoint:
+                x, y = waypoint.split(":")[:2]
+                coords.append((float(x), float(y)))
+            elif waypoint in self._pos:
+                coords.append(self._pos[waypoint])
+            elif waypoint in self.nodes:
+                coords.append(self.nodes[waypoint].pos)
+
+        return Route(ev.data["node"], np.array(coords, dtype=float).reshape(-1, 2))
@@ -0,0 +1,489 @@
+import asyncio
+import base64
+import hashlib
+import json
+import math
+import os
+import struct
+
+import numpy as np
+
+from .executor import EventExecutor
+from .model import Area, NodeRegistry, TimeFrame
+from .routes import RouteStore
+from .tracks import TrackStore
+
+STATIC_DIR = os.path.join(os.path.dirname(__file__), "static")
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_FPS = 20
+SNAPSHOT_EVERY = 256  # frames between two seek snapshots
+MAX_MESSAGE = 1 << 20  # largest client message accepted
+
+# ===== WebSocket (RFC 6455) =====
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+OP_CONTINUATION = 0x0
+OP_TEXT = 0x1
+OP_BINARY = 0x2
+OP_CLOSE = 0x8
+OP_PING = 0x9
+OP_PONG = 0xA
+
+# ===== binary messages, all fields little endian and 4 byte aligned =====
+# header: msg type, frame index, frame time, #moved, #buffer changes, #events
+FRAME_HEADER = struct.Struct("<IIdIII")
+MSG_FRAME = 1
+MSG_TIMES = 2  # type, #frames (u32), then the float64 time of every frame
+
+EV_SEND = 1
+EV_BEACON = 2
+NO_NODE = 0xFFFFFFFF
+
+LOOPBACK_HOSTS = ("127.0.0.1", "localhost", "[::1]")
+
+
+# =====================================================
+# WebSocket framing
+# =====================================================
+
+
+def accept_key(key: str) -> str:
+    digest = hashlib.sha1((key + WS_GUID).encode()).digest()
+    return base64.b64encode(digest).decode()
+
+
+def _unmask(payload: bytes, mask: bytes) -> bytes:
+    n = len(payload)
+    key = (mask * (n // 4 + 1))[:n]
+    return (int.from_bytes(payload, "big") ^ int.from_bytes(key, "big")).to_bytes(
+        n, "big"
+    )
+
+
+async def read_message(reader: asyncio.StreamReader):
+    """Next (opcode, payload), fragmented messages are joined"""
+    opcode = None
+    parts = []
+    size = 0
+
+    while True:
+        b1, b2 = await reader.readexactly(2)
+        fin = b1 & 0x80
+        op = b1 & 0x0F
+        length = b2 & 0x7F
+        if length == 126:
+            (length,) = struct.unpack("!H", await reader.readexactly(2))
+        elif length == 127:
+            (length,) = struct.unpack("!Q", await reader.readexactly(8))
+
+        size += length
+        if size > MAX_MESSAGE:
+            raise ConnectionError("websocket message too large")
+
+        mask = await reader.readexactly(4) if b2 & 0x80 else None
+        payload = await reader.readexactly(length)
+        if mask is not None:
+            payload = _unmask(payload, mask)
+
+        # control frames may arrive between fragments
+        if op >= OP_CLOSE:
+            return op, payload
+
+        if op != OP_CONTINUATION:
+            opcode = op
+        parts.append(payload)
+        if fin:
+            return opcode, b"".join(parts)
+
+
+def encode_frame(opcode: int, payload: bytes) -> bytes:
+    n = len(payload)
+    if n < 126:
+        header = struct.pack("!BB", 0x80 | opcode, n)
+    elif n < 1 << 16:
+        header = struct.pack("!BBH", 0x80 | opcode, 126, n)
+    else:
+        header = struct.pack("!BBQ", 0x80 | opcode, 127, n)
+    return header + payload
+
+
+# =====================================================
+# Shared trace
+# =====================================================
+
+
+class SharedTrace:
+    """
+    One loaded trace, shared read-only by every client: declared nodes,
+    timeline, route geometry, pos tracks and the playback state snapshotted
+    every SNAPSHOT_EVERY frames so a seek replays at most that many frames.
+    """
+
+    def __init__(
+        self,
+        area: Area | None,
+        nodes: NodeRegistry,
+        timeline: list[TimeFrame],
+        snapshot_every=SNAPSHOT_EVERY,
+    ):
+        self.area = area
+        self.nodes = nodes
+        self.timeline = timeline
+        self.snapshot_every = snapshot_every
+
+        self.times = np.array([tf.time for tf in timeline], dtype="<f8")
+
+        self.routes = RouteStore(nodes)
+        self.routes.add_frames(timeline)
+        self.tracks = TrackStore()
+        self.tracks.add_frames(timeline)
+
+        self.snapshots = []
+        state = nodes.copy()
+        executor = EventExecutor(state, self.routes, self.tracks)
+        # snapshot k is the state after frame k * snapshot_every
+        applied = 0
+        for i in range(0, len(timeline), snapshot_every):
+            executor.apply_range(timeline[applied : i + 1])
+            self.snapshots.append(state.snapshot())
+            applied = i + 1
+
+    def __len__(self):
+        return len(self.timeline)
+
+    def seek(self, state: NodeRegistry, executor: EventExecutor, current, target):
+        """Bring `state` from frame `current` to the one after applying 0..target"""
+        start = target - target % self.snapshot_every
+        if not current <= target < current + self.snapshot_every:
+            state.restore(self.snapshots[start // self.snapshot_every])
+            current = start
+
+        executor.apply_range(self.timeline[current + 1 : target + 1])
+
+    def index_at(self, t: float) -> int:
+        """Index of the last frame at or before `t`, 0 if there is none"""
+        return max(int(np.searchsorted(self.times, t, side="right")) - 1, 0)
+
+    def init_message(self) -> str:
+        nodes = self.nodes
+        return json.dumps(
+            {
+                "type": "init",
+                "area": [self.area.width, self.area.height] if self.area else None,
+                "frames": len(self.timeline),
+                "nodes": [
+                    {
+                        "id": nid,
+                        "type": nodes.types[nodes.type_code[i]],
+                        "color": [int(v) for v in nodes.color[i]],
+                        "buffer": int(nodes.buffer_size[i]),
+                        "ranges": nodes.ranges[i],
+                    }
+                    for i, nid in enumerate(nodes.ids)
+                ],
+            }
+        )
+
+    def times_message(self) -> bytes:
+        return struct.pack("<II", MSG_TIMES, len(self.times)) + self.times.tobytes()
+
+    def frame_events(self, index):
+        """send / beacon events of a frame as (kind, a, b) u32 triples + metas"""
+        lookup = self.nodes.index
+        triples = []
+        metas = []
+        for ev in self.timeline[index].events:
+            d = ev.data
+            if ev.type == "send":
+                triples += (
+                    EV_SEND,
+                    lookup.get(d.get("source"), NO_NODE),
+                    lookup.get(d.get("dest"), NO_NODE),
+                )
+                metas.append(d.get("meta", ""))
+            elif ev.type == "beacon":
+                triples += (EV_BEACON, lookup.get(d.get("node"), NO_NODE), NO_NODE)
+                metas.append("")
+        return np.array(triples, dtype="<u4"), metas
+
+
+# =====================================================
+# Client session
+# =====================================================
+
+
+def _number(msg: dict, key):
+    """Finite number under `key`, None if it is missing or anything else"""
+    v = msg.get(key)
+    if isinstance(v, bool) or not isinstance(v, (int, float)):
+        return None
+    return v if math.isfinite(v) else None
+
+
+class ClientSession:
+    """
+    Playback cursor of one WebSocket client. The client owns a copy of
+    the per node playback state (a few arrays) and remembers what it
+    last sent, so every frame only carries what changed.
+    """
+
+    def __init__(self, trace: SharedTrace, reader, writer):
+        self.trace = trace
+        self.reader = reader
+        self.writer = writer
+
+        self.state = trace.nodes.copy()
+        self.executor = EventExecutor(self.state, trace.routes, trace.tracks)
+        self.index = -1
+
+        self.sent_pos = np.full_like(self.state.pos, np.nan)
+        self.sent_count = np.full_like(self.state.buffer_count, -1)
+
+        self.fps = DEFAULT_FPS
+        self.player = None
+
+    async def send(self, opcode, payload):
+        self.writer.write(encode_frame(opcode, payload))
+        await self.writer.drain()
+
+    async def send_status(self):
+        status = {"type": "status", "frame": self.index, "playing": self.playing}
+        await self.send(OP_TEXT, json.dumps(status).encode())
+
+    @property
+    def playing(self):
+        return self.player is not None and not self.player.done()
+
+    # =====================================================
+    # Frames
+    # =====================================================
+
+    def goto(self, target):
+        target = min(max(target, 0), len(self.trace) - 1)
+        if target == self.index + 1:
+            tf = self.trace.timeline[target]
+            self.executor.apply_events(tf.events, tf.time)
+        elif target != self.index:
+            self.trace.seek(self.state, self.executor, self.index, target)
+        self.index = target
+
+    def frame_message(self) -> bytes:
+        pos = self.state.pos
+        moved = np.flatnonzero((pos != self.sent_pos).any(axis=1))
+        self.sent_pos[moved] = pos[moved]
+
+        counts = self.state.buffer_count
+        changed = np.flatnonzero(counts != self.sent_count)
+        self.sent_count[changed] = counts[changed]
+
+        events, metas = self.trace.frame_events(self.index)
+
+        return b"".join(
+            (
+                FRAME_HEADER.pack(
+                    MSG_FRAME,
+                    self.index,
+                    self.trace.timeline[self.index].time,
+                    len(moved),
+                    len(changed),
+                    len(metas),
+                ),
+                moved.astype("<u4").tobytes(),
+                pos[moved].astype("<f4").tobytes(),
+                changed.astype("<u4").tobytes(),
+                counts[changed].astype("<u4").tobytes(),
+                events.tobytes(),
+                json.dumps(metas).encode(),
+            )
+        )
+
+    async def show(self, target):
+        self.goto(target)
+        await self.send(OP_BINARY, self.frame_message())
+
+    async def _play(self):
+        try:
+            while self.index < len(self.trace) - 1:
+                await self.show(self.index + 1)
+                await asyncio.sleep(1 / self.fps)
+        finally:
+            if self.player is asyncio.current_task():
+                self.player = None
+        await self.send_status()
+
+    def pause(self):
+        if self.player is not None:
+            self.player.cancel()
+            self.player = None
+
+    # =====================================================
+    # Commands
+    # =====================================================
+
+    async def command(self, msg: dict):
+        """Apply one client command, malformed ones are ignored"""
+        cmd = msg.get("cmd")
+
+        if cmd == "play":
+            if not self.playing:
+                self.player = asyncio.create_task(self._play())
+        elif cmd == "pause":
+            self.pause()
+        elif cmd == "seek":
+            t = _number(msg, "time")
+            frame = _number(msg, "frame")
+            if t is not None:
+                target = self.trace.index_at(t)
+            elif frame is not None:
+                target = int(frame)
+            else:
+                return
+            self.pause()
+            await self.show(target)
+        elif cmd == "speed":
+            fps = _number(msg, "fps")
+            if fps is None:
+                return
+            self.fps = min(max(fps, 0.1), 1000.0)
+        else:
+            return
+
+        await self.send_status()
+
+    async def run(self):
+        await self.send(OP_TEXT, self.trace.init_message().encode())
+        await self.send(OP_BINARY, self.trace.times_message())
+        await self.show(0)
+        await self.send_status()
+
+        try:
+            while True:
+                opcode, payload = await read_message(self.reader)
+                if opcode == OP_CLOSE:
+                    await self.send(OP_CLOSE, payload[:2])
+                    break
+                if opcode == OP_PING:
+                    await self.send(OP_PONG, payload)
+                elif opcode == OP_TEXT:
+                    try:
+                        msg = json.loads(payload)
+                    except ValueError:
+                        continue
+                    if isinstance(msg, dict):
+                        await self.command(msg)
+        finally:
+            self.pause()
+
+
+# =====================================================
+# HTTP / server
+# =====================================================
+
+
+class TraceServer:
+    """
+    Serves the HTML canvas client and streams a SharedTrace to any number
+    of WebSocket clients (/ws), all on one asyncio loop.
+    """
+
+    def __init__(self, trace: SharedTrace, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        self.trace = trace
+        self.host = host
+        self.port = port
+        self.clients = set()
+
+        # pages allowed to open the WebSocket: only the one served here
+        hosts = [host]
+        if host in ("127.0.0.1", "localhost", "::1"):
+            hosts = LOOPBACK_HOSTS
+        self.origins = {f"http://{h}:{port}" for h in hosts}
+
+    async def serve_forever(self):
+        server = await asyncio.start_server(self._handle, self.host, self.port)
+        print(f"[INFO] Serving http://{self.host}:{self.port}/")
+        async with server:
+            await server.serve_forever()
+
+    async def _handle(self, reader, writer):
+        try:
+            request = await reader.readuntil(b"\r\n\r\n")
+            lines = request.decode("latin-1").split("\r\n")
+            method, path, _ = lines[0].split(" ", 2)
+            headers = {}
+            for line in lines[1:]:
+                if ":" in line:
+                    k, v = line.split(":", 1)
+                    headers[k.strip().lower()] = v.strip()
+
+            if path == "/ws" and headers.get("upgrade", "").lower() == "websocket":
+                await self._websocket(reader, writer, headers)
+            elif method == "GET" and path in ("/", "/index.html"):
+                await self._static(writer, "viewer.html", "text/html; charset=utf-8")
+            else:
+                await self._respond(writer, "404 Not Found", "text/plain", b"not found")
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+            pass
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, writer, status, content_type, body):
+        writer.write(
+            (
+                f"HTTP/1.1 {status}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                "Connection: close\r\n\r\n"
+            ).encode()
+            + body
+        )
+        await writer.drain()
+
+    async def _static(self, writer, name, content_type):
+        with open(os.path.join(STATIC_DIR, name), "rb") as f:
+            body = f.read()
+        await self._respond(writer, "200 OK", content_type, body)
+
+    async def _websocket(self, reader, writer, headers):
+        key = headers.get("sec-websocket-key")
+        if key is None:
+            await self._respond(writer, "400 Bad Request", "text/plain", b"no key")
+            return
+
+        # browsers always send Origin, so any other page open in the user's
+        # browser could otherwise read the trace
+        origin = headers.get("origin")
+        if origin is not None and origin not in self.origins:
+            await self._respond(writer, "403 Forbidden", "text/plain", b"bad origin")
+            return
+
+        writer.write(
+            (
+                "HTTP/1.1 101 Switching Protocols\r\n"
+                "Upgrade: websocket\r\n"
+                "Connection: Upgrade\r\n"
+                f"Sec-WebSocket-Accept: {accept_key(key)}\r\n\r\n"
+            ).encode()
+        )
+        await writer.drain()
+
+        session = ClientSession(self.trace, reader, writer)
+        self.clients.add(session)
+        print(f"[INFO] Client connected ({len(self.clients)} total)")
+        try:
+            await session.run()
+        finally:
+            self.clients.discard(session)
+            print(f"[INFO] Client disconnected ({len(self.clients)} total)")
+
+
+def serve(area, nodes, timeline, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    """Load the trace once and serve it until interrupted"""
+    trace = SharedTrace(area, nodes, timeline)
+    try:
+        asyncio.run(TraceServer(trace, host, port).serve_forever())
+    except KeyboardInterrupt:
+        print("[INFO] Server stopped")
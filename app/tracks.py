@@ -0,0 +1,75 @@
+from array import array
+
+import numpy as np
+
+from .model import Event, TimeFrame
+
+
+class TrackStore:
+    """
+    Every `pos` sample of a timeline, numbered in timeline order, so that
+    playback can move a node on the straight line from its last sample to
+    its next one instead of holding it at the last one.
+
+    - time, x, y: per sample
+    - next: number of the node's next sample, its own number for the last one
+
+    Kept in growable arrays, so a followed trace can keep adding samples.
+    """
+
+    def __init__(self):
+        self.samples = {}  # id(event) -> sample number
+        self.time = array("d")
+        self.x = array("d")
+        self.y = array("d")
+        self.next = array("q")
+
+        # nid -> number of its last sample so far
+        self._last = {}
+
+    def add_frames(self, frames: list[TimeFrame]):
+        """Add the samples of `frames`, which must follow the ones already added"""
+        for tf in frames:
+            for ev in tf.events:
+                if ev.type != "pos":
+                    continue
+
+                d = ev.data
+                k = len(self.time)
+                self.samples[id(ev)] = k
+                self.time.append(tf.time)
+                self.x.append(float(d["x"]))
+                self.y.append(float(d["y"]))
+                self.next.append(k)
+
+                prev = self._last.get(d["node"])
+                if prev is not None:
+                    self.next[prev] = k
+                self._last[d["node"]] = k
+
+    def get(self, ev: Event) -> int:
+        return self.samples[id(ev)]
+
+    def positions(self, samples: np.ndarray, time: float) -> np.ndarray:
+        """
+        (n, 2) positions at `time` of nodes whose last sample is `samples`,
+        linearly interpolated towards their next sample
+        """
+        # the views are dropped on return, the arrays must be able to grow
+        t = np.frombuffer(self.time)
+        x = np.frombuffer(self.x)
+        y = np.frombuffer(self.y)
+        after = np.frombuffer(self.next, dtype=np.int64)[samples]
+
+        dt = t[after] - t[samples]
+        frac = np.divide(
+            time - t[samples], dt, out=np.zeros(len(samples)), where=dt > 0
+        )
+        np.clip(frac, 0.0, 1.0, out=frac)
+
+        return np.column_stack(
+            (
+                x[samples] + frac * (x[after] - x[samples]),
+                y[samples] + frac * (y[after] - y[samples]),
+            )
+        )
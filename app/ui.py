@@ -3,11 +3,15 @@ import tkinter.font as tkfont
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 import matplotlib.pyplot as plt
 import bisect
+import time
 
 from app.model import Area, Node, TimeFrame
 
 from .canvas import CanvasView
 from .executor import EventExecutor
+from .profiling import PROFILER
+from .routes import RouteStore
+from .tracks import TrackStore
 
 
 # ? Step delay config
@@ -40,17 +44,22 @@ class VisualizerApp:
         nodes,
         timeline: list[TimeFrame],
         step_delay: StepDelay,
+        follower=None,
     ):
         self.root = root
         self.area = area
         self.nodes = nodes
         self.timeline = timeline
         self.step_delay = step_delay
+        self.follower = follower
 
         self.index = 0
         self.running = False
         self.after_id = None
+        self.follow_id = None
         self.selected_node = None
+        self.tick_due = None
+        self.tick_delay = 0
 
         self.root.title("DTN Visualizer")
         self.root.protocol("WM_DELETE_WINDOW", self.on_close)
@@ -65,6 +74,14 @@ class VisualizerApp:
         tk.Button(left, text="Reset View", command=self.reset_view).pack(fill=tk.X)
         tk.Button(left, text="Back to Zero", command=self.back_to_zero).pack(fill=tk.X)
 
+        self.show_routes = tk.BooleanVar(value=False)
+        tk.Checkbutton(
+            left,
+            text="Show all routes",
+            variable=self.show_routes,
+            command=self.toggle_routes,
+        ).pack(fill=tk.X)
+
         tk.Label(left, text="Jump to time (sec)").pack(fill=tk.X)
 
         self.time_entry = tk.Entry(left)
@@ -72,6 +89,12 @@ class VisualizerApp:
 
         tk.Button(left, text="Go", command=self.jump_to_time).pack(fill=tk.X)
 
+        self.auto_advance = tk.BooleanVar(value=True)
+        if self.follower is not None:
+            tk.Checkbutton(
+                left, text="Auto advance", variable=self.auto_advance
+            ).pack(fill=tk.X)
+
         self.timeline_label = tk.Label(left, text="Timeline")
         self.timeline_label.pack(fill=tk.X)
 
@@ -89,7 +112,12 @@ class VisualizerApp:
 
         fig, ax = plt.subplots()
         self.canvas_view = CanvasView(ax, area, nodes)
-        self.executor = EventExecutor(nodes, self.canvas_view)
+
+        self.routes = RouteStore(nodes)
+        self.routes.add_frames(self.timeline)
+        self.tracks = TrackStore()
+        self.tracks.add_frames(self.timeline)
+        self.executor = EventExecutor(nodes, self.routes, self.tracks)
 
         self.canvas = FigureCanvasTkAgg(fig, master=center)
         self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
@@ -115,6 +143,10 @@ class VisualizerApp:
         # Initial draw
         self._apply_first_event()  # always play the first event, which is setting position
 
+        if self.follower is not None:
+            self.follower.start()
+            self.follow_id = self.root.after(200, self._poll_follower)
+
     # ======================================================
     # Playback control
     # ======================================================
@@ -135,6 +167,7 @@ class VisualizerApp:
 
     def pause(self):
         self.running = False
+        self.tick_due = None
         self.play_btn.config(text="▶ Play")
 
         if self.after_id:
@@ -149,34 +182,83 @@ class VisualizerApp:
             self.pause()
             return
 
+        # a tick that fires more than one step late missed its frame
+        if self.tick_due is not None and PROFILER.enabled:
+            late = time.monotonic() - self.tick_due
+            if late > self.tick_delay:
+                PROFILER.count("dropped")
+
         tf = self.timeline[self.index]
-        self.executor.apply_events(tf.events)
+        self.executor.apply_events(tf.events, tf.time)
         self.render()
 
         events_type = [e.type for e in tf.events]
 
         self.index += 1
         if play_next:
-            self.after_id = self.root.after(
-                self.step_delay.get_delay(events_type), self._tick
+            delay = self.step_delay.get_delay(events_type)
+            self.tick_delay = delay / 1000
+            self.tick_due = time.monotonic() + self.tick_delay
+            self.after_id = self.root.after(delay, self._tick)
+
+    def _poll_follower(self):
+        frames = self.follower.poll()
+        if frames:
+            self.append_frames(frames)
+
+        if not self.follower.finished.is_set() or frames:
+            self.follow_id = self.root.after(200, self._poll_follower)
+
+    def append_frames(self, frames: list[TimeFrame]):
+        """Append frames read from a live trace to the timeline"""
+        # playback reached the tail and is waiting for new data
+        old_len = len(self.timeline)
+        at_end = self.index >= old_len - 1
+
+        # the timeline must stay sorted for find_index_by_time
+        in_order = []
+        last_time = self.timeline[-1].time
+        for tf in frames:
+            if tf.time < last_time:
+                print(f"[WARN] Dropping frame Time={tf.time} older than Time={last_time}")
+                continue
+            in_order.append(tf)
+            last_time = tf.time
+
+        self.routes.add_frames(in_order)
+        self.tracks.add_frames(in_order)
+
+        for tf in in_order:
+            last = self.timeline[-1]
+            if tf.time != last.time:
+                self.timeline.append(tf)
+                self.listbox.insert(tk.END, f"[{len(self.timeline) - 1}] Time={tf.time}")
+                continue
+
+            last.events.extend(tf.events)
+            # the merged frame has already been applied
+            applied = self.index == len(self.timeline) or (
+                self.index == len(self.timeline) - 1 and not self.running
             )
+            if applied:
+                self.executor.apply_events(tf.events, tf.time)
+
+        if len(self.timeline) == old_len:
+            return
+
+        if self.auto_advance.get() and at_end and not self.running:
+            # the frame under the cursor is already on screen
+            self.index = old_len
+            self.play()
 
     def _apply_first_event(self):
         tf = self.timeline[0]
-        self.executor.apply_events(tf.events)
+        self.executor.apply_events(tf.events, tf.time)
         self.render()
 
     def replay_to(self, target_index):
-        # reset executor + canvas bằng cách replay event 0
-        self.index = 0
-
-        tf0 = self.timeline[0]
-        self.executor.apply_events(tf0.events)
-
-        # replay từ 1 → target
-        for i in range(1, target_index + 1):
-            tf = self.timeline[i]
-            self.executor.apply_events(tf.events)
+        # replay từ 0 → target, một batch duy nhất
+        self.executor.apply_range(self.timeline[: target_index + 1])
 
         self.index = target_index
         self.render()
@@ -188,6 +270,10 @@ class VisualizerApp:
     def reset_view(self):
         self.canvas_view.reset_view()
 
+    def toggle_routes(self):
+        self.canvas_view.show_all_routes = self.show_routes.get()
+        self.render()
+
     def back_to_zero(self):
         self.replay_to(0)
 
@@ -204,26 +290,24 @@ class VisualizerApp:
         if not self.node_list.curselection():
             return
 
-        self.selected_node = self.node_list.get(self.node_list.curselection())
-        self.selected_node = self.selected_node.split()[0]
-        if self.selected_node == "none":
-            self.selected_node = None
+        # row 0 is "none", row i + 1 is node index i
+        row = self.node_list.curselection()[0]
+        self.selected_node = self.nodes.ids[row - 1] if row > 0 else None
         self.render()
 
     def update_node_list(self):
         # giữ selection hiện tại (nếu có)
-        selected = None
-        if self.node_list.curselection():
-            selected = self.node_list.get(self.node_list.curselection())
+        selected = self.node_list.curselection()
 
         self.node_list.delete(1, tk.END)
 
-        for nid, node in self.nodes.items():
-            label = f"{nid}  [{len(node.buffer)}/{node.buffer_size}]"
-            self.node_list.insert(tk.END, label)
+        counts = self.nodes.buffer_count.tolist()
+        sizes = self.nodes.buffer_size.tolist()
+        for nid, count, size in zip(self.nodes.ids, counts, sizes):
+            self.node_list.insert(tk.END, f"{nid}  [{count}/{size}]")
 
-            if selected and label.startswith(selected.split()[0]):
-                self.node_list.selection_set(tk.END)
+        if selected and selected[0] > 0:
+            self.node_list.selection_set(selected[0])
 
     def find_index_by_time(self, t: float):
         """
@@ -261,14 +345,19 @@ class VisualizerApp:
     # ======================================================
 
     def render(self):
-        self.update_node_list()
+        with PROFILER.stage("node_list"):
+            self.update_node_list()
+
+        # after playback ended index is one past the last (shown) frame
+        index = min(self.index, len(self.timeline) - 1)
+        tf = self.timeline[index]
 
-        self.timeline_label.config(text=f"Time: {self.timeline[self.index].time}")
+        self.timeline_label.config(text=f"Time: {tf.time}")
         route = None
         buffer = []
         beacon_nodes = []
 
-        for ev in self.timeline[self.index].events:
+        for ev in tf.events:
             if ev.type == "beacon":
                 beacon_nodes.append(ev.data["node"])
 
@@ -277,25 +366,33 @@ class VisualizerApp:
             route = n.route
             buffer = n.buffer
 
-            self.info.config(
-                text=(
-                    f"Node: {n.nid}\n"
-                    f"Type: {n.type}\n"
-                    f"Buffer: {len(n.buffer)}/{n.buffer_size}\n"
-                    # f"Route: {n.route}"
-                )
+            text = (
+                f"Node: {n.nid}\n"
+                f"Type: {n.type}\n"
+                f"Buffer: {len(n.buffer)}/{n.buffer_size}\n"
             )
+            if route:
+                text += f"Route: {len(route)} waypoints, {route.length:.0f} m\n"
+            self.info.config(text=text)
         else:
             self.info.config(text="")
 
         self.canvas_view.redraw(
             route,
             self.selected_node,
-            self.timeline[self.index].events,
+            tf.events,
             buffer,
             beacon_nodes,
         )
-        self.canvas.draw_idle()
+
+        if PROFILER.enabled:
+            self.canvas_view.set_hud(PROFILER.hud_text())
+            # draw now instead of on idle, so the Agg draw lands in this frame
+            with PROFILER.stage("draw"):
+                self.canvas.draw()
+            PROFILER.end_frame(frame=index, time=tf.time)
+        else:
+            self.canvas.draw_idle()
 
     # ======================================================
     # Shutdown
@@ -306,11 +403,17 @@ class VisualizerApp:
 
         self.running = False
 
-        if self.after_id:
-            try:
-                self.root.after_cancel(self.after_id)
-            except Exception:
-                pass
+        if self.follower is not None:
+            self.follower.stop()
+
+        PROFILER.close()
+
+        for after_id in (self.after_id, self.follow_id):
+            if after_id:
+                try:
+                    self.root.after_cancel(after_id)
+                except Exception:
+                    pass
 
         self.root.quit()
         self.root.destroy()
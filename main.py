@@ -1,6 +1,9 @@
 from platform import node
 from app.ui import StepDelay, VisualizerApp
 from app.parser import parse_log_file
+from app.follow import TraceFollower
+from app.profiling import PROFILER
+from app.server import serve, DEFAULT_PORT
 import tkinter.font as tkfont
 import tkinter as tk
 import sys
@@ -12,9 +15,43 @@ if __name__ == "__main__":
         idx = sys.argv.index("--file")
         LOG_FILE = sys.argv[idx + 1]
 
+    # processes for block-compressed traces, 1 disables parallel parsing
+    JOBS = None
+    if "--jobs" in sys.argv:
+        idx = sys.argv.index("--jobs")
+        JOBS = int(sys.argv[idx + 1])
+
+    # --profile [path]: stage timings, on-canvas HUD and a per-frame JSON log
+    if "--profile" in sys.argv:
+        idx = sys.argv.index("--profile")
+        log_path = "profile.jsonl"
+        if idx + 1 < len(sys.argv) and not sys.argv[idx + 1].startswith("--"):
+            log_path = sys.argv[idx + 1]
+        PROFILER.enable(log_path)
+
+    # --follow: keep reading the trace while the simulation appends to it
+    follower = None
+    if "--follow" in sys.argv:
+        follower = TraceFollower(LOG_FILE)
+        area, nodes, timeline = follower.load()
+    else:
+        area, nodes, timeline = parse_log_file(LOG_FILE, workers=JOBS)
+
+    PROFILER.record(phase="parse", file=LOG_FILE)
+
+    # --serve [port]: web viewer on localhost instead of the Tk window
+    if "--serve" in sys.argv:
+        idx = sys.argv.index("--serve")
+        port = DEFAULT_PORT
+        if idx + 1 < len(sys.argv) and not sys.argv[idx + 1].startswith("--"):
+            port = int(sys.argv[idx + 1])
+        serve(area, nodes, timeline, port=port)
+        PROFILER.close()
+        sys.exit(0)
+
     root = tk.Tk()
     root.option_add("*Font", tkfont.Font(family="DejaVu Sans", size=11))
-    area, nodes, timeline = parse_log_file(LOG_FILE)
+
     delay_config = StepDelay(1, 1, 100)
-    ui = VisualizerApp(root, area, nodes, timeline, delay_config)
+    ui = VisualizerApp(root, area, nodes, timeline, delay_config, follower)
     root.mainloop()
@@ -0,0 +1,250 @@
+import argparse
+import gc
+import gzip
+import os
+import random
+import struct
+import sys
+import tempfile
+import time
+import zlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.model import Event, TimeFrame  # noqa: E402
+from app.parser import merge_frames, parse_events_text, parse_kv  # noqa: E402
+from app.parser import parse_log_file  # noqa: E402
+
+# ===============================
+# Configuration defaults
+# ===============================
+DEFAULT_FRAMES = 200000
+DEFAULT_FERRIES = 10
+DEFAULT_GROUNDS = 40
+DEFAULT_REPEAT = 3
+DEFAULT_SEED = 1
+BGZF_BLOCK_SIZE = 65280  # what bgzip puts in one block
+ZSTD_FRAME_SIZE = 1024 * 1024
+
+
+# ===============================
+# Synthetic trace
+# ===============================
+def generate_trace(path, frames, n_ferries, n_grounds, seed):
+    """Write a ferry-like trace: mostly pos lines, some send / buffer / beacon"""
+    random.seed(seed)
+    grounds = [f"g{i}" for i in range(n_grounds)]
+    ferries = [f"f{i + n_grounds}" for i in range(n_ferries)]
+
+    with open(path, "w") as f:
+        f.write("--Declare\n")
+        f.write("area=4000|4000\n")
+        for nid in grounds:
+            f.write(f"node={nid} type=ground group=0 color=255|0|0 buffer=5\n")
+        for nid in ferries:
+            f.write(
+                f"node={nid} type=ferry group=0 color=0|0|255 buffer=20 range=120|109\n"
+            )
+
+        f.write("--Events\n")
+        f.write("Time=0\n")
+        for nid in grounds + ferries:
+            f.write(
+                f"event=pos node={nid} x={random.uniform(0, 4000):g} "
+                f"y={random.uniform(0, 4000):g}\n"
+            )
+            f.write(f"event=buffer node={nid} list=| reason=init\n")
+
+        for i in range(1, frames):
+            f.write(f"Time={i * 0.25:g}\n")
+            for nid in ferries:
+                f.write(
+                    f"event=pos node={nid} x={random.uniform(0, 4000):g} "
+                    f"y={random.uniform(0, 4000):g}\n"
+                )
+            if i % 10 == 0:
+                src = random.choice(ferries)
+                f.write(f"event=beacon node={src}\n")
+                dst = random.choice(grounds)
+                f.write(f"event=send source={src} dest={dst} meta=BUNDLE\n")
+                f.write(f"event=buffer node={src} list=0|2|{i} reason=receive\n")
+
+
+# ===============================
+# Compressed copies
+# ===============================
+def write_gzip(src, dst):
+    """Single stream gzip, not seekable: always parsed serially"""
+    with open(src, "rb") as f, gzip.open(dst, "wb") as out:
+        out.write(f.read())
+
+
+def write_bgzf(src, dst, block_size=BGZF_BLOCK_SIZE):
+    """BGZF: gzip members of at most 64 KB, with their size in a BC extra field"""
+    with open(src, "rb") as f, open(dst, "wb") as out:
+        while True:
+            data = f.read(block_size)
+            if not data:
+                break
+            comp = zlib.compressobj(6, zlib.DEFLATED, -15)
+            body = comp.compress(data) + comp.flush()
+            out.write(
+                b"\x1f\x8b\x08\x04\0\0\0\0\0\xff"
+                + struct.pack("<H2sHH", 6, b"BC", 2, len(body) + 25)
+                + body
+                + struct.pack("<II", zlib.crc32(data), len(data))
+            )
+
+
+def write_zstd_frames(src, dst, frame_size=ZSTD_FRAME_SIZE):
+    """One zstd frame per `frame_size` bytes of text"""
+    import zstandard
+
+    cctx = zstandard.ZstdCompressor()
+    with open(src, "rb") as f, open(dst, "wb") as out:
+        while True:
+            data = f.read(frame_size)
+            if not data:
+                break
+            out.write(cctx.compress(data))
+
+
+def compressed_copies(path, directory=None):
+    """(label, path) of every compressed form of the trace that can be written"""
+    writers = [("gzip", ".gz", write_gzip), ("bgzf", ".bgz", write_bgzf)]
+    try:
+        import zstandard  # noqa: F401
+
+        writers.append(("zstd", ".zst", write_zstd_frames))
+    except ImportError:
+        print("zstd: skipped, the zstandard package is not installed")
+
+    copies = []
+    base = os.path.join(directory or tempfile.gettempdir(), os.path.basename(path))
+    for label, suffix, write in writers:
+        write(path, base + suffix)
+        copies.append((label, base + suffix))
+    return copies
+
+
+def generic_parse_events(lines):
+    """Events section parser with parse_kv on every line, for reference"""
+    timeline = []
+    current_time = None
+    current_events = []
+
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+
+        if line.startswith("Time="):
+            if current_time is not None:
+                timeline.append(TimeFrame(current_time, current_events))
+            current_time = float(line.split("=")[1])
+            current_events = []
+            continue
+
+        fields = parse_kv(line)
+        if "event" in fields:
+            current_events.append(Event(fields["event"], fields))
+
+    if current_time is not None:
+        timeline.append(TimeFrame(current_time, current_events))
+
+    timeline.sort(key=lambda tf: tf.time)
+    return merge_frames(timeline)
+
+
+def best_cpu_time(fn, repeat):
+    # parse_log_file runs the tokenizers with the cyclic GC paused
+    gc.disable()
+    try:
+        best = None
+        for _ in range(repeat):
+            start = time.process_time()
+            fn()
+            elapsed = time.process_time() - start
+            best = elapsed if best is None else min(best, elapsed)
+    finally:
+        gc.enable()
+    return best
+
+
+def bench_tokenizer(path, repeat):
+    """generic parse_kv loop vs the per event type fast path tokenizer"""
+    with open(path) as f:
+        text = f.read()
+    text = text[text.find("--Events") :].split("\n", 1)[1]
+    lines = text.split("\n")
+
+    generic = best_cpu_time(lambda: generic_parse_events(lines), repeat)
+    fast = best_cpu_time(lambda: parse_events_text(text), repeat)
+
+    print(f"tokenizer generic  {generic:8.3f} s")
+    print(f"tokenizer fastpath {fast:8.3f} s  x{generic / fast:.2f}")
+
+
+def bench(path, workers, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        parse_log_file(path, workers=workers)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+# ===============================
+# Main
+# ===============================
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--file", type=str, default=None)
+    parser.add_argument("--frames", type=int, default=DEFAULT_FRAMES)
+    parser.add_argument("--ferries", type=int, default=DEFAULT_FERRIES)
+    parser.add_argument("--grounds", type=int, default=DEFAULT_GROUNDS)
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument(
+        "--jobs", type=int, nargs="+", default=[1, 2, 4, os.cpu_count() or 1]
+    )
+    parser.add_argument(
+        "--no-compressed",
+        dest="compressed",
+        action="store_false",
+        help="skip the gzip / BGZF / zstd copies of the trace",
+    )
+
+    args = parser.parse_args()
+
+    path = args.file
+    if path is None:
+        path = os.path.join(tempfile.gettempdir(), "bench_trace.log")
+        generate_trace(path, args.frames, args.ferries, args.grounds, args.seed)
+
+    size_mb = os.path.getsize(path) / 1e6
+    print(f"trace: {path} ({size_mb:.1f} MB)")
+
+    bench_tokenizer(path, args.repeat)
+
+    # everything is compared with the serial parse of the plain trace
+    baseline = bench(path, 1, args.repeat)
+    cases = [("plain", path)]
+    if args.compressed:
+        cases += compressed_copies(path)
+
+    for label, case_path in cases:
+        case_mb = os.path.getsize(case_path) / 1e6
+        # only block-compressed traces are parsed in parallel
+        jobs = [1] if label in ("plain", "gzip") else sorted(set(args.jobs))
+        for workers in jobs:
+            elapsed = bench(case_path, workers, args.repeat)
+            print(
+                f"{label:<6} {case_mb:7.1f} MB  jobs={workers:<3} {elapsed:8.3f} s  "
+                f"{size_mb / elapsed:7.1f} MB/s  x{baseline / elapsed:.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
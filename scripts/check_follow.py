@@ -0,0 +1,170 @@
+import argparse
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.follow import TraceFollower  # noqa: E402
+from app.parser import parse_log_file  # noqa: E402
+
+# ===============================
+# Configuration defaults
+# ===============================
+DEFAULT_FILES = ["example/ferry.log_", "example/test.log_"]
+DEFAULT_WRITE_SIZE = 777  # bytes per write, so lines get split
+POLL_INTERVAL = 0.01
+IDLE_POLLS = 50
+EARLY_EVENT = b"event=pos node=early x=1 y=2\n"  # before any Time= line
+
+
+def frames_key(timeline):
+    return [(tf.time, [(ev.type, ev.data) for ev in tf.events]) for tf in timeline]
+
+
+def append_frames(timeline, frames):
+    """Same merge as VisualizerApp.append_frames"""
+    for tf in frames:
+        if timeline and tf.time == timeline[-1].time:
+            timeline[-1].events.extend(tf.events)
+        else:
+            timeline.append(tf)
+
+
+def follow(path, write):
+    """Run `write()` as the stand-in writer and follow `path` to the end"""
+    writer = threading.Thread(target=write)
+    writer.start()
+
+    follower = TraceFollower(path, poll_interval=POLL_INTERVAL)
+    _, _, timeline = follower.load()
+    follower.start()
+
+    writer.join()
+    # a regular file never signals the end, stop once the reader went quiet
+    idle = 0
+    while not follower.finished.is_set() and idle < IDLE_POLLS:
+        frames = follower.poll()
+        append_frames(timeline, frames)
+        idle = 0 if frames else idle + 1
+        time.sleep(POLL_INTERVAL)
+
+    follower.stop()
+    append_frames(timeline, follower.poll())
+    return timeline
+
+
+# ===============================
+# Sources
+# ===============================
+def check_file(data, path, size):
+    # content that exists before following starts, ending mid line
+    head = len(data) // 3
+
+    with open(path, "wb") as f:
+        f.write(data[:head])
+
+    def write():
+        with open(path, "ab") as f:
+            for i in range(head, len(data), size):
+                f.write(data[i : i + size])
+                f.flush()
+                time.sleep(0.001)
+
+    return follow(path, write)
+
+
+def check_fifo(data, path, size):
+    os.mkfifo(path)
+
+    def write():
+        with open(path, "wb") as f:
+            for i in range(0, len(data), size):
+                f.write(data[i : i + size])
+                f.flush()
+
+    return follow(path, write)
+
+
+def check_socket(data, path, size):
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(path)
+    server.listen(1)
+
+    def write():
+        conn, _ = server.accept()
+        with conn:
+            for i in range(0, len(data), size):
+                conn.sendall(data[i : i + size])
+        server.close()
+
+    return follow(path, write)
+
+
+def check_early_events(data, path, size):
+    """
+    The reader catches up while the events section holds an event but no
+    Time= line yet. Like the serial parser it must drop that event, not
+    emit a frame without a time.
+    """
+    start = data.index(b"--Events")
+    start = data.index(b"\n", start) + 1
+    body = data[:start] + EARLY_EVENT + data[start:]
+
+    with open(path, "wb") as f:
+        f.write(body[: start + len(EARLY_EVENT)])
+
+    def write():
+        # give the follower time to reach the end of the early event
+        time.sleep(IDLE_POLLS * POLL_INTERVAL)
+        with open(path, "ab") as f:
+            for i in range(start + len(EARLY_EVENT), len(body), size):
+                f.write(body[i : i + size])
+                f.flush()
+
+    return follow(path, write)
+
+
+# ===============================
+# Main
+# ===============================
+def main():
+    parser = argparse.ArgumentParser(
+        description="Feed traces through a file, a named pipe and a unix socket "
+        "and check that following them gives the parse_log_file timeline"
+    )
+    parser.add_argument("files", nargs="*", default=DEFAULT_FILES)
+    parser.add_argument("--write-size", type=int, default=DEFAULT_WRITE_SIZE)
+    args = parser.parse_args()
+
+    failed = False
+    for filename in args.files:
+        with open(filename, "rb") as f:
+            data = f.read()
+        # a trailing partial line is only parsed once the writer goes away
+        if not data.endswith(b"\n"):
+            data += b"\n"
+
+        expected = frames_key(parse_log_file(filename, workers=1)[2])
+
+        for name, check in (
+            ("file", check_file),
+            ("fifo", check_fifo),
+            ("socket", check_socket),
+            ("early", check_early_events),
+        ):
+            with tempfile.TemporaryDirectory() as tmp:
+                timeline = check(data, os.path.join(tmp, "trace"), args.write_size)
+
+            ok = frames_key(timeline) == expected
+            failed |= not ok
+            print(f"{filename:<24} {name:<7} {'ok' if ok else 'MISMATCH'}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+import argparse
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.compression import block_index, detect_format  # noqa: E402
+from app.parallel import (  # noqa: E402
+    assemble,
+    parse_blocks_parallel,
+    stitch,
+    tokenize_block,
+)
+from app.parser import parse_log_file  # noqa: E402
+from bench_parser import compressed_copies, generate_trace  # noqa: E402
+
+# ===============================
+# Configuration defaults
+# ===============================
+DEFAULT_FILES = ["example/ferry.log_", "example/test.log_"]
+DEFAULT_FRAMES = 20000
+DEFAULT_WORKERS = 4
+
+# traces the tokenizer has to get right besides the regular event records
+EDGE_CASES = [
+    "--Events\nTime=0\nevent=\n",
+    "--Declare\n"
+    "node=0 type=ferry group=0 color=255|0|0 buffer=10\n"
+    "--Events\n"
+    "Time=0\n"
+    "event=\n"
+    "Time=1\n"
+    "event=pos node=0 x=1 y=2\n"
+    "event=buffer node=0 list=\n"
+    "event=custom node=0 value=\n",
+]
+
+
+def parse_key(result):
+    """Everything a parse produces, in comparable form"""
+    area, nodes, timeline = result
+    declared = [
+        (nid, node.type, node.group, node.color, node.buffer_size, node.ranges)
+        for nid, node in nodes.items()
+    ]
+    frames = [
+        (tf.time, [(ev.type, list(ev.data.items())) for ev in tf.events])
+        for tf in timeline
+    ]
+    return area, declared, frames
+
+
+def check(label, expected, result):
+    ok = parse_key(result) == expected
+    print(f"{label:<40} {'ok' if ok else 'MISMATCH'}")
+    return ok
+
+
+# ===============================
+# Main
+# ===============================
+def main():
+    parser = argparse.ArgumentParser(
+        description="Check that the compressed and parallel block parsers give "
+        "the serial timeline of the plain trace"
+    )
+    parser.add_argument("files", nargs="*", default=DEFAULT_FILES)
+    parser.add_argument("--frames", type=int, default=DEFAULT_FRAMES)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        generated = os.path.join(tmp, "generated.log")
+        generate_trace(generated, args.frames, 10, 40, seed=1)
+        edge_cases = []
+        for k, text in enumerate(EDGE_CASES):
+            edge_cases.append(os.path.join(tmp, f"edge_case_{k}.log"))
+            with open(edge_cases[-1], "w") as f:
+                f.write(text)
+
+        failed = False
+        for filename in args.files + [generated] + edge_cases:
+            expected = parse_key(parse_log_file(filename, workers=1))
+            name = os.path.basename(filename)
+
+            # the worker tokenizer without the pool, small traces have no blocks
+            with open(filename, "rb") as f:
+                result = assemble(stitch([tokenize_block(f.read())]))
+            failed |= not check(f"{name} tokenized", expected, result)
+
+            # small files skip the pool in parse_log_file, call it directly
+            for label, copy in compressed_copies(filename, tmp):
+                result = parse_log_file(copy, workers=1)
+                failed |= not check(f"{name} {label} jobs=1", expected, result)
+
+                fmt = detect_format(copy)
+                blocks = block_index(copy, fmt)
+                if blocks:
+                    result = parse_blocks_parallel(copy, fmt, blocks, args.workers)
+                    label = f"{name} {label} jobs={args.workers}"
+                    failed |= not check(label, expected, result)
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.compact import compact_timeline, write_trace  # noqa: E402
+from app.parser import parse_log_file  # noqa: E402
+
+# ===============================
+# Configuration defaults
+# ===============================
+DEFAULT_TOLERANCE = 1.0  # same unit as the trace positions (m)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Drop pos samples that playback interpolates back within "
+        "the tolerance and repeated buffer snapshots, write a smaller trace"
+    )
+    parser.add_argument("input")
+    parser.add_argument("output", help="compacted trace, gzip compressed if *.gz")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--jobs", type=int, default=None)
+
+    args = parser.parse_args()
+
+    area, nodes, timeline = parse_log_file(args.input, workers=args.jobs)
+    compacted, stats = compact_timeline(nodes, timeline, args.tolerance)
+    write_trace(args.output, area, nodes, compacted)
+
+    size_in = os.path.getsize(args.input)
+    size_out = os.path.getsize(args.output)
+
+    print(f"pos     {stats.pos_in:>10} -> {stats.pos_out:<10}")
+    print(f"buffer  {stats.buffer_in:>10} -> {stats.buffer_out:<10}")
+    print(f"frames  {stats.frames_in:>10} -> {stats.frames_out:<10}")
+    print(f"size    {size_in:>10} -> {size_out:<10} bytes  x{size_in / size_out:.2f}")
+    print(
+        f"max position error in playback {stats.max_error:.4f} "
+        f"(tolerance {args.tolerance:g})"
+    )
+
+
+if __name__ == "__main__":
+    main()